@@ -6,12 +6,23 @@
 import re
 import json
 import os
+import subprocess
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict
 import wave
+import numpy as np
+from PIL import ImageFont
 from moviepy import AudioFileClip
 
 
+# RST字幕指令的字段前缀及对应的键名
+_PREFIXES = (':start_time:', ':end_time:', ':duration:', ':text:')
+_KEYS = ('start_time', 'end_time', 'duration', 'text')
+
+# 中英文标点符号及连续空白（预编译）
+_PUNCT_RE = re.compile(r'[，。！？：；""''「」『』（）【】《》〈〉、,.!?:;"\'()\\[\\]{}<>/|~`@#$%^&*+=_-]')
+_WS_RE = re.compile(r'\s+')
+
 class SubtitleProcessor:
     """字幕处理核心类"""
     
@@ -27,42 +38,59 @@ class SubtitleProcessor:
             
     def remove_punctuation(self, text: str) -> str:
         """去除标点符号"""
-        # 定义中英文标点符号模式
-        punctuation_pattern = r'[，。！？：；""''「」『』（）【】《》〈〉、,.!?:;"\'()\\[\\]{}<>/|~`@#$%^&*+=_-]'
-        # 去除标点符号，用空格替换
-        clean_text = re.sub(punctuation_pattern, ' ', text)
-        # 去除多余的空格
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-        return clean_text
+        # 标点替换为空格，再合并多余的空格
+        return _WS_RE.sub(' ', _PUNCT_RE.sub(' ', text)).strip()
     
     def split_into_chunks(self, text: str, max_chars_per_chunk: int = 15) -> List[str]:
         """将文本分块，每块不超过指定字符数"""
         # 先按空格分割成词
         words = text.split()
         chunks = []
-        current_chunk = ""
+        current = []
+        cur_len = 0
         
         for word in words:
-            # 检查添加这个词后是否会超过限制
-            test_chunk = current_chunk + (" " if current_chunk else "") + word
+            # 检查添加这个词（及分隔空格）后是否会超过限制
+            new_len = cur_len + (1 if current else 0) + len(word)
             
-            if len(test_chunk) <= max_chars_per_chunk:
-                # 不超过限制，添加这个词
-                current_chunk = test_chunk
+            if new_len <= max_chars_per_chunk or not current:
+                # 不超过限制（或当前块为空），添加这个词
+                current.append(word)
+                cur_len = new_len
             else:
                 # 超过限制，保存当前块并开始新块
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                current_chunk = word
+                chunks.append(' '.join(current))
+                current = [word]
+                cur_len = len(word)
         
         # 添加最后一个块
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        if current:
+            chunks.append(' '.join(current))
             
         return chunks
     
     def get_audio_duration(self, audio_path: str) -> float:
         """获取音频文件的时长（秒）"""
+        # WAV直接读取文件头，无需启动ffmpeg
+        if audio_path.lower().endswith('.wav'):
+            try:
+                with wave.open(audio_path, 'rb') as w:
+                    return w.getnframes() / w.getframerate()
+            except (wave.Error, EOFError):
+                pass
+        
+        # 其他格式用ffprobe只读取容器时长
+        try:
+            result = subprocess.run(
+                ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+                 '-of', 'csv=p=0', audio_path],
+                capture_output=True, text=True, check=True
+            )
+            return float(result.stdout)
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            pass
+        
+        # 没有ffprobe时退回moviepy
         try:
             audio_clip = AudioFileClip(audio_path)
             duration = audio_clip.duration
@@ -227,13 +255,7 @@ class SubtitleProcessor:
         for i, (caption_text, audio_path) in enumerate(zip(captions_list, audio_files_list), 1):
             # 获取音频时长
             if os.path.exists(audio_path):
-                try:
-                    from moviepy import AudioFileClip
-                    audio_clip = AudioFileClip(audio_path)
-                    scene_duration = audio_clip.duration
-                    audio_clip.close()
-                except Exception as e:
-                    scene_duration = 3.0
+                scene_duration = self.get_audio_duration(audio_path) or 3.0
             else:
                 print(f"  警告：音频文件不存在 {audio_path}")
                 scene_duration = 3.0
@@ -341,9 +363,25 @@ class SubtitleRenderer:
     def __init__(self, rst_path: str):
         """初始化渲染器"""
         self.rst_path = rst_path
-        self.timing_info = []
         self.style_config = {}
+        
+        # 字幕片段按列存储：连续的时间数组 + 文本列表，逐帧查找只访问时间数组
+        self._starts = np.empty(0, dtype=np.float64)
+        self._ends = np.empty(0, dtype=np.float64)
+        self._durations = np.empty(0, dtype=np.float64)
+        self._texts: List[str] = []
+        self._scenes: List[str] = []
+        self._timing_info = None
+        
         self.parse_rst_file()
+        
+        # 样式在渲染期间不变，展开为属性供逐帧直接读取
+        self.font_path = self.style_config.get('font_family')
+        self.font_size = self.style_config.get('font_size', 70)
+        self.stroke_width = self.style_config.get('stroke_width', 3)
+        self.font_color = self.style_config.get('font_color', '#FFFFFF')
+        self.stroke_color = self.style_config.get('stroke_color', '#000000')
+        self.font = self.load_font()
     
     def parse_rst_file(self):
         """解析RST文件提取字幕信息"""
@@ -351,51 +389,33 @@ class SubtitleRenderer:
             with open(self.rst_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # 解析字幕片段信息 - 使用正确的RST指令格式
-            # 匹配 .. subtitle:: 指令块
-            pattern = r'.. subtitle::\s*(.+?)\s+:start_time:\s*([0-9.]+)\s+:end_time:\s*([0-9.]+)\s+:duration:\s*([0-9.]+)\s+:text:\s*(.+?)(?=\n\n|\n.. subtitle::|\Z)'
-            matches = re.findall(pattern, content, re.MULTILINE | re.DOTALL)
+            # 单遍逐行扫描 .. subtitle:: 指令块
+            segments = []
+            current_subtitle = {}
+            for line in content.splitlines():
+                line = line.strip()
+                if line.startswith('.. subtitle::'):
+                    # 新的字幕块开始，保存上一块
+                    if 'text' in current_subtitle:
+                        segments.append(current_subtitle)
+                    current_subtitle = {'scene': line[len('.. subtitle::'):].strip()}
+                    continue
+                for prefix, key in zip(_PREFIXES, _KEYS):
+                    if line.startswith(prefix):
+                        value = line[len(prefix):].strip()
+                        current_subtitle[key] = value if key == 'text' else float(value)
+                        break
             
-            for match in matches:
-                scene_name = match[0].strip()
-                start_time = float(match[1])
-                end_time = float(match[2])
-                duration = float(match[3])
-                text = match[4].strip()
-                
-                self.timing_info.append({
-                    'text': text,
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'duration': duration,
-                    'scene': scene_name
-                })
+            # 添加最后一个字幕
+            if 'text' in current_subtitle:
+                segments.append(current_subtitle)
             
-            # 如果解析失败，尝试备用模式
-            if not self.timing_info:
-                # 逐行解析模式
-                lines = content.split('\n')
-                current_subtitle = {}
-                
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith('.. subtitle::'):
-                        # 新的字幕块开始
-                        if current_subtitle and 'text' in current_subtitle:
-                            self.timing_info.append(current_subtitle)
-                        current_subtitle = {'scene': line.replace('.. subtitle::', '').strip()}
-                    elif line.startswith(':start_time:'):
-                        current_subtitle['start_time'] = float(line.split(':')[-1].strip())
-                    elif line.startswith(':end_time:'):
-                        current_subtitle['end_time'] = float(line.split(':')[-1].strip())
-                    elif line.startswith(':duration:'):
-                        current_subtitle['duration'] = float(line.split(':')[-1].strip())
-                    elif line.startswith(':text:'):
-                        current_subtitle['text'] = line.split(':', 2)[-1].strip()
-                
-                # 添加最后一个字幕
-                if current_subtitle and 'text' in current_subtitle:
-                    self.timing_info.append(current_subtitle)
+            self._starts = np.array([seg.get('start_time', 0.0) for seg in segments], dtype=np.float64)
+            self._ends = np.array([seg.get('end_time', 0.0) for seg in segments], dtype=np.float64)
+            self._durations = np.array([seg.get('duration', 0.0) for seg in segments], dtype=np.float64)
+            self._texts = [seg['text'] for seg in segments]
+            self._scenes = [seg['scene'] for seg in segments]
+            self._timing_info = None
             
             # 设置默认样式配置
             self.style_config = {
@@ -416,13 +436,44 @@ class SubtitleRenderer:
             import traceback
             traceback.print_exc()
     
+    def load_font(self) -> ImageFont.FreeTypeFont:
+        """按样式配置加载字体（只在初始化时加载一次）"""
+        try:
+            return ImageFont.truetype(self.font_path, self.font_size)
+        except Exception as e:
+            print(f"警告：无法加载字体 {self.font_path}，使用默认字体: {e}")
+            return ImageFont.load_default()
+    
     def get_subtitle_at_time(self, current_time: float) -> str:
-        """根据时间获取对应的字幕文本"""
-        for info in self.timing_info:
-            if info['start_time'] <= current_time <= info['end_time']:
-                return info['text']
+        """
+        根据时间获取对应的字幕文本
+        
+        返回第一个包含该时间的片段（片段两端都包含在内）：相邻片段首尾时间相同时，
+        边界时刻显示前一个片段。查找不依赖任何调用状态，多线程共用时结果一致。
+        """
+        i = int(np.searchsorted(self._ends, current_time, side='left'))
+        if i < len(self._texts) and self._starts[i] <= current_time:
+            return self._texts[i]
         return ""
     
+    @property
+    def timing_info(self) -> List[Dict]:
+        """字典形式的时间信息（首次访问时由列数据生成）"""
+        if self._timing_info is None:
+            self._timing_info = [
+                {
+                    'text': text,
+                    'start_time': float(start),
+                    'end_time': float(end),
+                    'duration': float(duration),
+                    'scene': scene
+                }
+                for text, start, end, duration, scene in zip(
+                    self._texts, self._starts, self._ends, self._durations, self._scenes
+                )
+            ]
+        return self._timing_info
+    
     def get_timing_info(self) -> List[Dict]:
         """获取所有时间信息"""
         return self.timing_info
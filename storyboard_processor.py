@@ -9,13 +9,14 @@ Storyboard Processor
 3. 使用Azure AI Speech Service生成storyline的配音文件（默认启用）
 
 Usage:
-    python storyboard_processor.py [--shot shot_name] [--no-audio] [--no-enhance] [--assets-dir path]
+    python storyboard_processor.py [--shot shot_name] [--no-audio] [--no-enhance] [--processes N] [--quiet] [--assets-dir path]
 
 Examples:
     python storyboard_processor.py                              # 处理所有故事板，自动生成音频和LLM prompts
     python storyboard_processor.py --shot shot_01               # 处理指定故事板，自动生成音频和LLM prompts
     python storyboard_processor.py --no-audio                   # 跳过音频生成
     python storyboard_processor.py --no-enhance                 # 跳过LLM生成，使用基础翻译
+    python storyboard_processor.py --processes 0                # 使用全部CPU核心，每个分集一个进程
     python storyboard_processor.py --shot shot_01 --no-audio --no-enhance  # 只处理基础prompts和字幕
 """
 
@@ -23,15 +24,44 @@ import json
 import os
 import sys
 import argparse
+import asyncio
+import threading
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import struct
+import hashlib
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from itertools import chain
+from functools import lru_cache, partial
+from typing import Dict, List, Any, Tuple, Optional
 from dotenv import load_dotenv
-import re
+import time
 from datetime import datetime
 
 # 加载环境变量
 load_dotenv()
 
+# 处理过程的输出统一走logger，由main()配置的后台线程写到终端
+logger = logging.getLogger(__name__)
+
+
+class _FallbackHandler(logging.StreamHandler):
+    """调用方没有配置任何日志处理器时，把日志直接写到标准输出"""
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        if not logging.getLogger().handlers:
+            super().emit(record)
+
+
+# 作为库使用（如直接调用process / process_single_shot）时默认仍输出INFO级别的进度；
+# 调用方配置了根logger时由其处理器输出，可通过本logger的级别调整详细程度
+_fallback_handler = _FallbackHandler(sys.stdout)
+_fallback_handler.setFormatter(logging.Formatter('%(message)s'))
+logger.addHandler(_fallback_handler)
+logger.setLevel(logging.INFO)
+
 # Azure AI Speech Service 语音合成工具
 try:
     import azure.cognitiveservices.speech as speechsdk
@@ -42,14 +72,196 @@ except ImportError:
 
 # OpenAI LLM API for prompt enhancement
 try:
-    from openai import OpenAI
+    import httpx
+    from openai import AsyncOpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
     print("警告: openai 未安装，prompt增强功能将不可用")
 
+# h2（可选）让LLM客户端使用HTTP/2，并发请求复用同一个连接
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+    print("警告: h2 未安装，LLM请求将使用HTTP/1.1连接池")
+
+# tenacity（可选）为LLM请求提供指数退避重试
+try:
+    from tenacity import AsyncRetrying, wait_random_exponential, stop_after_attempt, retry_if_exception_type
+    TENACITY_AVAILABLE = True
+except ImportError:
+    TENACITY_AVAILABLE = False
+    print("警告: tenacity 未安装，LLM请求将使用openai客户端自带的重试")
+
+# orjson（可选）加速JSON解析和序列化
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("警告: orjson 未安装，JSON读写将使用标准库json")
+
 from enum import Enum
 
+def _json_dumps(data: Any) -> str:
+    """序列化为缩进2格、不转义中文的JSON字符串"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def _json_loads(content) -> Any:
+    """解析JSON字符串或字节串"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _load_json(path: Path) -> Any:
+    """读取JSON文件"""
+    return _json_loads(Path(path).read_bytes())
+
+
+def _dir_file_names(folder: Path) -> set:
+    """一次扫描目录，返回其中的文件名集合（目录不存在时为空集合）"""
+    try:
+        with os.scandir(folder) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except OSError:
+        return set()
+
+
+def _file_md5(path: Path) -> str:
+    """计算文件内容的MD5"""
+    return hashlib.md5(Path(path).read_bytes()).hexdigest()
+
+
+def _write_json(path: Path, data: Any) -> None:
+    """写入JSON文件（UTF-8，缩进2格）"""
+    if ORJSON_AVAILABLE:
+        # 直接写入orjson生成的UTF-8字节，不经过str解码和文本模式编码
+        Path(path).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        Path(path).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def _write_json_atomic(path: Path, data: Any) -> None:
+    """
+    先写入同目录下的临时文件再替换目标文件，其他进程读到的总是完整的旧文件或新文件
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        _write_json(tmp_path, data)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _write_json_array(path: Path, items: List[Any]) -> None:
+    """
+    逐个元素序列化并写入JSON数组文件（输出与 _write_json 完全一致），
+    不在内存中拼出整个文件内容
+    """
+    if not items:
+        _write_json(path, items)
+        return
+    
+    if ORJSON_AVAILABLE:
+        def dumps(item):
+            return orjson.dumps(item, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        def dumps(item):
+            return json.dumps(item, ensure_ascii=False, indent=2).encode('utf-8')
+    
+    with open(path, 'wb', buffering=65536) as f:
+        f.write(b'[\n')
+        for i, item in enumerate(items):
+            # 数组元素整体缩进一层（JSON字符串内不会出现换行符，可以直接替换）
+            if i:
+                f.write(b',\n')
+            f.write(b'  ' + dumps(item).replace(b'\n', b'\n  '))
+        f.write(b'\n]')
+
+
+@lru_cache(maxsize=8192)
+def _translate_to_flux_prompt(chinese_desc: str) -> str:
+    """将中文视觉描述转换为基础的Flux风格英文prompt（结果按描述缓存，多个分集重复的描述只构建一次）"""
+    # 简化的备用方案：直接使用中文描述生成基础prompt
+    # 这个方法主要在LLM不可用时作为最后备用
+    
+    # 基本清理：移除一些明显的中文标点
+    cleaned_desc = chinese_desc.replace("，", ", ").replace("。", ". ")
+    
+    # 生成基础的Flux风格prompt
+    flux_style_prefix = "Cinematic shot, high quality, detailed rendering, "
+    flux_style_suffix = ", dramatic lighting, masterpiece, best quality, ultra detailed, 8k resolution"
+    
+    # 构建最终的基础Flux prompt
+    return f"{flux_style_prefix}{cleaned_desc}{flux_style_suffix}"
+
+
+class _SceneStream:
+    """
+    从LLM流式返回的JSON文本中增量提取已完整的场景对象
+    
+    场景对象指数组中的对象（不含场景对象内部嵌套的对象），因此同时适用于
+    单分集的 [{...}, ...] 和多分集的 {"shot_01": [{...}, ...], ...} 两种格式。
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self) -> None:
+        """清空解析状态（重试时重新开始）"""
+        self.items: List[Dict[str, Any]] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._item_depth = None
+        self._item_parts: List[str] = []
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """输入一段增量文本，返回其中新完成的场景对象"""
+        completed = []
+        start = 0 if self._item_depth is not None else None
+        for i, char in enumerate(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '[{':
+                if char == '{' and self._item_depth is None and self._stack and self._stack[-1] == '[':
+                    self._item_depth = len(self._stack)
+                    self._item_parts = []
+                    start = i
+                self._stack.append(char)
+            elif char in ']}' and self._stack:
+                self._stack.pop()
+                if self._item_depth is not None and len(self._stack) == self._item_depth:
+                    self._item_parts.append(text[start:i + 1])
+                    self._item_depth = None
+                    start = None
+                    try:
+                        item = _json_loads("".join(self._item_parts))
+                    except ValueError:
+                        continue
+                    if isinstance(item, dict):
+                        self.items.append(item)
+                        completed.append(item)
+        if self._item_depth is not None:
+            self._item_parts.append(text[start:])
+        return completed
+
+
 class VoiceType(Enum):
     """支持的中文音色枚举"""
     YUNXI = "zh-CN-YunxiNeural"      # 年轻男性，温和友好
@@ -71,62 +283,149 @@ class AzureSpeechSynthesizer:
             
         self.speech_key = speech_key
         self.region = region
-        self.base_config = speechsdk.SpeechConfig(subscription=speech_key, region=region)
-        self.base_config.speech_synthesis_language = "zh-CN"
+        
+        # 每种音色一个语音配置，初始化时创建一次
+        self._configs = {}
+        for voice in VoiceType:
+            config = speechsdk.SpeechConfig(subscription=speech_key, region=region)
+            config.speech_synthesis_language = "zh-CN"
+            config.speech_synthesis_voice_name = voice.value
+            self._configs[voice] = config
+        
+        # 合成器按线程缓存：同一线程的后续请求复用已建立的连接，
+        # 不同线程各自持有合成器，避免并发请求在同一个合成器上排队
+        self._local = threading.local()
+    
+    def _get_synthesizer(self, voice: VoiceType) -> "speechsdk.SpeechSynthesizer":
+        """获取当前线程指定音色的合成器（首次使用时创建）"""
+        synthesizers = getattr(self._local, 'synthesizers', None)
+        if synthesizers is None:
+            synthesizers = self._local.synthesizers = {}
+        if voice not in synthesizers:
+            # 不设置音频输出设备，只生成音频数据
+            synthesizers[voice] = speechsdk.SpeechSynthesizer(speech_config=self._configs[voice], audio_config=None)
+        return synthesizers[voice]
     
-    def synthesize_text(self, text: str, voice: VoiceType, output_file: str = None) -> bytes:
-        """合成文本为语音
+    def synthesize_text(self, text: str, voice: VoiceType, output_file: str = None) -> Optional[bytes]:
+        """合成文本为语音（流式接收，音频边到达边写入）
         
         Args:
             text: 要合成的文本
             voice: 音色类型 (VoiceType枚举)
-            output_file: 输出文件名，如果为None则不保存文件
+            output_file: 输出WAV文件名，如果为None则返回音频数据
             
         Returns:
-            bytes: 音频数据
+            bytes: 未指定output_file时返回音频数据，否则返回None
             
         Raises:
             Exception: 合成失败时抛出异常
         """
-        # 创建语音配置
-        config = speechsdk.SpeechConfig(subscription=self.speech_key, region=self.region)
-        config.speech_synthesis_language = "zh-CN"
-        config.speech_synthesis_voice_name = voice.value
+        # 复用当前线程的合成器
+        synthesizer = self._get_synthesizer(voice)
         
-        # 创建合成器（不设置音频输出设备，只生成音频数据）
-        synthesizer = speechsdk.SpeechSynthesizer(speech_config=config, audio_config=None)
+        # 开始合成，收到首个音频块时即返回
+        request_time = time.perf_counter()
+        result = synthesizer.start_speaking_text_async(text).get()
         
-        # 合成语音
-        result = synthesizer.speak_text_async(text).get()
+        if result.reason == speechsdk.ResultReason.Canceled:
+            self._raise_cancellation(result.cancellation_details)
+        elif result.reason not in (speechsdk.ResultReason.SynthesizingAudioStarted,
+                                   speechsdk.ResultReason.SynthesizingAudioCompleted):
+            raise Exception(f"未知错误: {result.reason}")
         
-        # 检查结果
-        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-            # 保存文件（如果指定了输出文件）
-            if output_file:
-                with open(output_file, "wb") as f:
-                    f.write(result.audio_data)
-            
-            return result.audio_data
-            
-        elif result.reason == speechsdk.ResultReason.Canceled:
-            cancellation_details = result.cancellation_details
-            error_msg = f"语音合成失败: {cancellation_details.reason}"
-            if cancellation_details.reason == speechsdk.CancellationReason.Error:
-                error_msg += f"\n错误详情: {cancellation_details.error_details}"
-            raise Exception(error_msg)
+        first_byte_latency_ms = (time.perf_counter() - request_time) * 1000
+        
+        # 从音频流读取剩余数据，不在内存中等待完整结果
+        stream = speechsdk.AudioDataStream(result)
+        audio_data = None
+        if output_file:
+            stream.save_to_wav_file(output_file)
         else:
-            raise Exception(f"未知错误: {result.reason}")
+            chunks = []
+            buffer = bytes(32000)
+            filled = stream.read_data(buffer)
+            while filled > 0:
+                chunks.append(buffer[:filled])
+                filled = stream.read_data(buffer)
+            audio_data = b"".join(chunks)
+        
+        if stream.status == speechsdk.StreamStatus.Canceled:
+            self._raise_cancellation(stream.cancellation_details)
+        
+        logger.info(f"   首字节延迟: {first_byte_latency_ms:.0f} ms")
+        return audio_data
+    
+    @staticmethod
+    def _raise_cancellation(cancellation_details) -> None:
+        """根据取消详情抛出合成失败异常"""
+        error_msg = f"语音合成失败: {cancellation_details.reason}"
+        if cancellation_details.reason == speechsdk.CancellationReason.Error:
+            error_msg += f"\n错误详情: {cancellation_details.error_details}"
+        raise Exception(error_msg)
+
+
+# 系统prompt（单分集和多分集请求共用）。作为所有请求的公共前缀，内容必须保持
+# 逐字节不变（不要插入时间戳等可变内容），服务端才能复用前缀缓存
+SYSTEM_PROMPT = """你是一个专业的AI图像生成prompt专家，专门为Flux AI图像生成模型创建高质量的英文prompt。
+
+你的任务是根据给定的中文视觉描述，直接生成专业的英文Flux prompt，要求：
+1. 详细准确地描述画面内容
+2. 包含专业的艺术风格描述
+3. 添加适当的光影效果描述
+4. 增强画面构图和视觉效果
+5. 保持场景之间的连贯性和风格统一性
+6. 使用专业的英文艺术术语
+
+请返回相同JSON格式，为每个场景添加flux_prompt字段，保持其他字段不变。
+生成的prompt应该适合Flux AI图像生成模型，风格统一、详细专业。"""
+
+# 单分集请求的固定说明，放在场景JSON之前，使可变内容位于消息末尾
+BATCH_USER_PROMPT = """请根据下面JSON中每个场景的chinese_description，生成对应的flux_prompt字段，保持JSON格式不变。
+
+要求：
+1. 为每个场景添加flux_prompt字段（基于chinese_description生成）
+2. 保持scene_number和chinese_description字段不变
+3. 确保所有场景的风格保持一致，适合连续的视频场景
+4. flux_prompt要详细、专业，适合Flux AI图像生成
+5. 包含适当的画质、光影、构图描述
+6. 返回完整的JSON格式
+
+示例flux_prompt格式：
+"Cinematic shot, high quality, detailed rendering, [具体场景描述], dramatic lighting, masterpiece, best quality, ultra detailed, 8k resolution"
+
+场景JSON：
+"""
+
+# 多分集请求的固定说明
+MULTISHOT_USER_PROMPT = """下面JSON的键是分集名称，值是该分集的场景列表。请根据每个场景的chinese_description，生成对应的flux_prompt字段，保持JSON格式不变。
+
+要求：
+1. 返回与输入相同键的JSON对象，每个分集的场景数量和顺序保持不变
+2. 为每个场景添加flux_prompt字段（基于chinese_description生成）
+3. 保持scene_number和chinese_description字段不变
+4. 确保同一分集内所有场景的风格保持一致，适合连续的视频场景
+5. flux_prompt要详细、专业，适合Flux AI图像生成，包含适当的画质、光影、构图描述
+
+示例flux_prompt格式：
+"Cinematic shot, high quality, detailed rendering, [具体场景描述], dramatic lighting, masterpiece, best quality, ultra detailed, 8k resolution"
+
+分集JSON：
+"""
 
 
 class PromptEnhancer:
     """使用LLM增强Flux图像生成prompt的类"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, max_concurrency: int = 4, cache_path: Optional[Path] = None,
+                 max_attempts: int = 5):
         """
         初始化prompt增强器
         
         Args:
             api_key: ARK API密钥，如果为None则从环境变量ARK_API_KEY读取
+            max_concurrency: 同时进行的LLM请求数上限（遵守ARK限流）
+            cache_path: prompt缓存文件路径，为None时不使用缓存
+            max_attempts: 限流/网络/服务端错误时的最大尝试次数（需要tenacity）
         """
         if not OPENAI_AVAILABLE:
             raise ImportError("openai 未安装，请运行: pip install --upgrade \"openai>=1.0\"")
@@ -135,13 +434,107 @@ class PromptEnhancer:
         if not self.api_key:
             raise ValueError("未找到 ARK_API_KEY，请在.env文件中添加: ARK_API_KEY=your_api_key_here")
         
-        # 初始化OpenAI客户端
-        self.client = OpenAI(
+        # 异步OpenAI客户端和并发信号量在事件循环中首次请求时创建（两者都绑定到该事件循环），
+        # 多个分集的请求共用连接池并发进行
+        self.client = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        
+        # prompt缓存: {sha1(chinese_description): flux_prompt}
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.prompt_cache: Dict[str, str] = {}
+        if self.cache_path and self.cache_path.exists():
+            try:
+                self.prompt_cache = _load_json(self.cache_path)
+                logger.info(f"📦 已加载 {len(self.prompt_cache)} 条prompt缓存")
+            except Exception as e:
+                logger.warning(f"⚠️  读取prompt缓存失败: {e}")
+    
+    def _create_client(self) -> "AsyncOpenAI":
+        """创建带连接池和超时设置的异步OpenAI客户端"""
+        # 保持长连接避免每个请求重新握手；连接超时5秒，读取超时60秒（流式接收时按每个数据块计算）
+        # 安装了h2时启用HTTP/2，并发的流式请求在同一个连接上多路复用
+        http_client = httpx.AsyncClient(
+            http2=H2_AVAILABLE,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+        # 使用tenacity重试时关闭客户端自带的重试，避免重试次数叠加
+        return AsyncOpenAI(
             base_url="https://ark.cn-beijing.volces.com/api/v3",
             api_key=self.api_key,
+            max_retries=0 if TENACITY_AVAILABLE else 2,
+            http_client=http_client,
         )
     
-    def enhance_flux_prompts_batch(self, visual_descriptions: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    async def aclose(self) -> None:
+        """关闭客户端及其连接池（需在创建它的事件循环中调用），下次请求时在新的事件循环中重新创建"""
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+        self.semaphore = None
+    
+    @staticmethod
+    def _cache_key(chinese_description: str) -> str:
+        """计算中文描述的缓存键"""
+        return hashlib.sha1(chinese_description.strip().encode('utf-8')).hexdigest()
+    
+    def _split_cached(self, visual_descriptions: List[Dict[str, str]]) -> Tuple[List[Optional[str]], List[Dict[str, str]]]:
+        """
+        按缓存拆分视觉描述
+        
+        Returns:
+            Tuple: (每个场景命中的flux_prompt，未命中为None, 未命中缓存的描述列表)
+        """
+        cached_prompts = []
+        pending = []
+        for desc in visual_descriptions:
+            prompt = self.prompt_cache.get(self._cache_key(desc.get('chinese_description', '')))
+            cached_prompts.append(prompt)
+            if prompt is None:
+                pending.append(desc)
+        return cached_prompts, pending
+    
+    @staticmethod
+    def _merge_cached(visual_descriptions: List[Dict[str, str]], cached_prompts: List[Optional[str]],
+                      enhanced_pending: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """把缓存命中的prompt和新生成的结果按原顺序合并"""
+        enhanced_iter = iter(enhanced_pending)
+        merged = []
+        for desc, prompt in zip(visual_descriptions, cached_prompts):
+            if prompt is None:
+                merged.append(next(enhanced_iter))
+            else:
+                merged.append(dict(desc, flux_prompt=prompt))
+        return merged
+    
+    def _remember(self, enhanced_descriptions: List[Dict[str, str]]) -> None:
+        """把LLM生成的prompts写入缓存并保存到文件"""
+        if self.cache_path is None:
+            return
+        added = 0
+        for desc in enhanced_descriptions:
+            prompt = desc.get('flux_prompt')
+            if prompt:
+                self.prompt_cache[self._cache_key(desc.get('chinese_description', ''))] = prompt
+                added += 1
+        if not added:
+            return
+        try:
+            # 多进程处理时其他进程可能已经写入了新条目：先合并文件中的内容再整体替换
+            if self.cache_path.exists():
+                try:
+                    on_disk = _load_json(self.cache_path)
+                except Exception as e:
+                    logger.warning(f"⚠️  读取prompt缓存失败: {e}")
+                else:
+                    self.prompt_cache = {**on_disk, **self.prompt_cache}
+            _write_json_atomic(self.cache_path, self.prompt_cache)
+        except Exception as e:
+            logger.warning(f"⚠️  保存prompt缓存失败: {e}")
+    
+    async def enhance_flux_prompts_batch(self, visual_descriptions: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], bool]:
         """
         使用LLM基于中文描述直接生成高质量的Flux图像生成prompts
         
@@ -149,90 +542,231 @@ class PromptEnhancer:
             visual_descriptions: 包含中文描述的视觉描述列表
             
         Returns:
-            List[Dict[str, str]]: 生成完整Flux prompts的视觉描述列表
+            Tuple[List[Dict[str, str]], bool]: (生成完整Flux prompts的视觉描述列表, 是否使用了备用方法)
         """
+        # 只把未命中缓存的场景发送给LLM
+        cached_prompts, pending = self._split_cached(visual_descriptions)
+        if not pending:
+            logger.info(f"📦 全部 {len(visual_descriptions)} 个场景命中prompt缓存，跳过LLM调用")
+            return self._merge_cached(visual_descriptions, cached_prompts, []), False
+        
         try:
-            # 构建系统prompt
-            system_prompt = """你是一个专业的AI图像生成prompt专家，专门为Flux AI图像生成模型创建高质量的英文prompt。
-
-你的任务是根据给定的中文视觉描述，直接生成专业的英文Flux prompt，要求：
-1. 详细准确地描述画面内容
-2. 包含专业的艺术风格描述
-3. 添加适当的光影效果描述
-4. 增强画面构图和视觉效果
-5. 保持场景之间的连贯性和风格统一性
-6. 使用专业的英文艺术术语
-
-请返回相同JSON格式，为每个场景添加flux_prompt字段，保持其他字段不变。
-生成的prompt应该适合Flux AI图像生成模型，风格统一、详细专业。"""
-
             # 将visual_descriptions转换为JSON字符串
-            input_json = json.dumps(visual_descriptions, ensure_ascii=False, indent=2)
+            input_json = _json_dumps(pending)
             
-            # 构建用户prompt
-            user_content = f"""请根据以下JSON中每个场景的chinese_description，生成对应的flux_prompt字段，保持JSON格式不变：
-
-{input_json}
-
-要求：
-1. 为每个场景添加flux_prompt字段（基于chinese_description生成）
-2. 保持scene_number和chinese_description字段不变
-3. 确保所有场景的风格保持一致，适合连续的视频场景
-4. flux_prompt要详细、专业，适合Flux AI图像生成
-5. 包含适当的画质、光影、构图描述
-6. 返回完整的JSON格式
-
-示例flux_prompt格式：
-"Cinematic shot, high quality, detailed rendering, [具体场景描述], dramatic lighting, masterpiece, best quality, ultra detailed, 8k resolution"
-"""
+            # 构建用户prompt（固定说明在前，场景JSON在后）
+            user_content = BATCH_USER_PROMPT + input_json
             
-            # 调用LLM API
-            response = self.client.chat.completions.create(
-                model="doubao-1-5-pro-32k-250115",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                temperature=0.7,
-                max_tokens=8000  # 增加token限制以处理更多内容
-            )
-            
-            enhanced_content = response.choices[0].message.content.strip()
+            scene_stream = _SceneStream()
+            enhanced_content = await self._complete(user_content, scene_stream)
             
             # 尝试解析返回的JSON
             try:
-                # 移除可能的markdown代码块标记
-                if enhanced_content.startswith("```json"):
-                    enhanced_content = enhanced_content[7:]
-                if enhanced_content.startswith("```"):
-                    enhanced_content = enhanced_content[3:]
-                if enhanced_content.endswith("```"):
-                    enhanced_content = enhanced_content[:-3]
-                
-                enhanced_descriptions = json.loads(enhanced_content.strip())
+                enhanced_descriptions = _json_loads(enhanced_content)
                 
                 # 验证返回的数据结构
-                if isinstance(enhanced_descriptions, list) and len(enhanced_descriptions) == len(visual_descriptions):
-                    # 验证每个描述都有flux_prompt字段
-                    for i, desc in enumerate(enhanced_descriptions):
-                        if not desc.get('flux_prompt'):
-                            print(f"⚠️  场景 {desc.get('scene_number', i+1)} 的flux_prompt为空，生成默认prompt")
-                            chinese_desc = desc.get('chinese_description', '')
-                            desc['flux_prompt'] = f"Cinematic shot, high quality, detailed rendering, {chinese_desc}, dramatic lighting, masterpiece, best quality, ultra detailed, 8k resolution"
-                    
-                    return enhanced_descriptions
+                if isinstance(enhanced_descriptions, list) and len(enhanced_descriptions) == len(pending):
+                    self._remember(enhanced_descriptions)
+                    self._fill_empty_prompts(enhanced_descriptions)
+                    return self._merge_cached(visual_descriptions, cached_prompts, enhanced_descriptions), False
                 else:
-                    print(f"⚠️  LLM返回的数据结构不正确")
-                    return self._generate_fallback_prompts(visual_descriptions)
+                    logger.warning(f"⚠️  LLM返回的数据结构不正确")
                     
             except json.JSONDecodeError as e:
-                print(f"⚠️  LLM返回的内容无法解析为JSON: {e}")
-                print(f"返回内容: {enhanced_content[:500]}...")
-                return self._generate_fallback_prompts(visual_descriptions)
+                logger.warning(f"⚠️  LLM返回的内容无法解析为JSON: {e}")
+                logger.info(f"返回内容: {enhanced_content[:500]}...")
+                
+                # 回复被截断时保留流式解析出的完整场景，其余场景使用备用方法
+                salvaged = scene_stream.items
+                if 0 < len(salvaged) < len(pending):
+                    logger.warning(f"⚠️  保留已完整返回的 {len(salvaged)} 个场景，其余 {len(pending) - len(salvaged)} 个使用备用方法")
+                    self._remember(salvaged)
+                    self._fill_empty_prompts(salvaged)
+                    salvaged = salvaged + self._generate_fallback_prompts(pending[len(salvaged):])
+                    return self._merge_cached(visual_descriptions, cached_prompts, salvaged), True
             
         except Exception as e:
-            print(f"⚠️  LLM prompt生成失败: {e}")
-            return self._generate_fallback_prompts(visual_descriptions)
+            logger.warning(f"⚠️  LLM prompt生成失败: {e}")
+        
+        return self._merge_cached(visual_descriptions, cached_prompts, self._generate_fallback_prompts(pending)), True
+    
+    async def enhance_flux_prompts_multishot(self, shots: Dict[str, List[Dict[str, str]]],
+                                             max_scenes_per_request: int = 32) -> Dict[str, List[Dict[str, str]]]:
+        """
+        把多个分集的场景合并到同一个LLM请求中生成Flux prompts
+        
+        分集按顺序装入请求，每个请求的场景总数不超过max_scenes_per_request；
+        单个分集超过上限时按上限切成多段，分别放入各自的请求。多个请求并发进行，
+        返回后按原顺序拼回各分集。返回结果中缺失或结构不正确的片段单独走
+        enhance_flux_prompts_batch。
+        
+        Args:
+            shots: {分集名称: 视觉描述列表}
+            max_scenes_per_request: 每个请求的场景数上限（受max_tokens限制）
+            
+        Returns:
+            Dict[str, List[Dict[str, str]]]: {分集名称: 生成flux_prompt后的视觉描述列表}
+        """
+        # 只把未命中缓存的场景发送给LLM
+        cached = {}
+        pending_shots = {}
+        for shot_name, descriptions in shots.items():
+            cached[shot_name], pending = self._split_cached(descriptions)
+            if pending:
+                pending_shots[shot_name] = pending
+        
+        # 按场景数上限分组（超长分集先切段，同一分集的各段按顺序落在不同请求中）
+        groups = []
+        current_group = {}
+        current_count = 0
+        for shot_name, descriptions in pending_shots.items():
+            for start in range(0, len(descriptions), max_scenes_per_request):
+                piece = descriptions[start:start + max_scenes_per_request]
+                if current_group and current_count + len(piece) > max_scenes_per_request:
+                    groups.append(current_group)
+                    current_group = {}
+                    current_count = 0
+                current_group[shot_name] = piece
+                current_count += len(piece)
+        if current_group:
+            groups.append(current_group)
+        
+        if groups:
+            logger.info(f"🤖 开始使用LLM为 {len(pending_shots)} 个分集生成图像prompt（{len(groups)} 个请求）...")
+        if len(pending_shots) < len(shots):
+            logger.info(f"📦 {len(shots) - len(pending_shots)} 个分集全部命中prompt缓存")
+        
+        enhanced = {}
+        for group_result in await asyncio.gather(*(self._enhance_shot_group(group) for group in groups)):
+            for shot_name, shot_result in group_result.items():
+                enhanced.setdefault(shot_name, []).extend(shot_result)
+        
+        return {
+            shot_name: self._merge_cached(descriptions, cached[shot_name], enhanced.get(shot_name, []))
+            for shot_name, descriptions in shots.items()
+        }
+    
+    async def _enhance_shot_group(self, group: Dict[str, List[Dict[str, str]]]) -> Dict[str, List[Dict[str, str]]]:
+        """用一个LLM请求为一组分集生成prompts"""
+        input_json = _json_dumps(group)
+        user_content = MULTISHOT_USER_PROMPT + input_json
+        enhanced = {}
+        try:
+            enhanced = _json_loads(await self._complete(user_content))
+            if not isinstance(enhanced, dict):
+                logger.warning(f"⚠️  LLM返回的数据结构不正确")
+                enhanced = {}
+        except Exception as e:
+            logger.warning(f"⚠️  多分集prompt生成失败: {e}")
+        
+        results = {}
+        for shot_name, descriptions in group.items():
+            shot_result = enhanced.get(shot_name)
+            if isinstance(shot_result, list) and len(shot_result) == len(descriptions):
+                self._remember(shot_result)
+                self._fill_empty_prompts(shot_result)
+                results[shot_name] = shot_result
+            else:
+                # 该分集的结果缺失，单独请求
+                logger.warning(f"⚠️  {shot_name} 的结果缺失，单独生成")
+                results[shot_name], _ = await self.enhance_flux_prompts_batch(descriptions)
+        return results
+    
+    async def _complete(self, user_content: str, scene_stream: Optional[_SceneStream] = None) -> str:
+        """
+        调用LLM并返回去掉markdown代码块标记的回复内容
+        
+        Args:
+            user_content: 用户prompt
+            scene_stream: 流式接收时用于增量提取已完成场景的解析器
+            
+        Returns:
+            str: 回复内容
+        """
+        if TENACITY_AVAILABLE:
+            # 限流、网络和5xx错误按指数退避（带随机抖动）重试，其余错误直接抛出
+            retrying = AsyncRetrying(
+                wait=wait_random_exponential(min=1, max=30),
+                stop=stop_after_attempt(self.max_attempts),
+                retry=retry_if_exception_type((RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)),
+                before_sleep=lambda state: logger.warning(
+                    f"⚠️  LLM请求失败（第 {state.attempt_number} 次）: {state.outcome.exception()}，稍后重试"
+                ),
+                reraise=True,
+            )
+            content = await retrying(self._create_completion, user_content, scene_stream)
+        else:
+            content = await self._create_completion(user_content, scene_stream)
+        
+        content = content.strip()
+        
+        # 移除可能的markdown代码块标记
+        if content.startswith("```json"):
+            content = content[7:]
+        if content.startswith("```"):
+            content = content[3:]
+        if content.endswith("```"):
+            content = content[:-3]
+        return content.strip()
+    
+    async def _create_completion(self, user_content: str, scene_stream: Optional[_SceneStream] = None) -> str:
+        """
+        发送一次流式LLM请求并拼接回复内容（信号量限制并发请求数，退避等待期间不占用名额）
+        
+        每个场景的对象一完整返回就被解析出来，回复被max_tokens截断时已完成的场景仍可使用。
+        """
+        if scene_stream is not None:
+            scene_stream.reset()
+        
+        if self.client is None:
+            self.client = self._create_client()
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async with self.semaphore:
+            stream = await self.client.chat.completions.create(
+                model="doubao-1-5-pro-32k-250115",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": user_content}
+                ],
+                temperature=0.7,
+                max_tokens=8000,  # 增加token限制以处理更多内容
+                stream=True,
+                stream_options={"include_usage": True}  # 最后一个数据块附带token用量
+            )
+            
+            parts = []
+            async for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    self._log_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                if scene_stream is not None:
+                    for scene in scene_stream.feed(delta):
+                        logger.info(f"   场景 {scene.get('scene_number', len(scene_stream.items))} 的prompt已返回")
+        
+        return "".join(parts)
+    
+    @staticmethod
+    def _log_usage(usage) -> None:
+        """打印token用量，包括命中前缀缓存的输入token数"""
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = getattr(details, 'cached_tokens', None) or 0
+        logger.info(f"   LLM token用量: 输入 {usage.prompt_tokens}（缓存命中 {cached_tokens}）, 输出 {usage.completion_tokens}")
+    
+    @staticmethod
+    def _fill_empty_prompts(enhanced_descriptions: List[Dict[str, str]]) -> None:
+        """为flux_prompt为空的场景生成默认prompt"""
+        for i, desc in enumerate(enhanced_descriptions):
+            if not desc.get('flux_prompt'):
+                logger.warning(f"⚠️  场景 {desc.get('scene_number', i+1)} 的flux_prompt为空，生成默认prompt")
+                chinese_desc = desc.get('chinese_description', '')
+                desc['flux_prompt'] = f"Cinematic shot, high quality, detailed rendering, {chinese_desc}, dramatic lighting, masterpiece, best quality, ultra detailed, 8k resolution"
     
     def _generate_fallback_prompts(self, visual_descriptions: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
@@ -244,36 +778,43 @@ class PromptEnhancer:
         Returns:
             添加了基础flux_prompt的描述列表
         """
-        fallback_descriptions = []
-        for desc in visual_descriptions:
-            chinese_desc = desc.get('chinese_description', '')
-            # 使用原有的translate_to_flux_prompt方法作为备用
-            fallback_prompt = self.translate_to_flux_prompt(chinese_desc)
-            
-            fallback_desc = desc.copy()
-            fallback_desc['flux_prompt'] = fallback_prompt
-            fallback_descriptions.append(fallback_desc)
-        
-        return fallback_descriptions
+        # 使用translate_to_flux_prompt的基础翻译作为备用
+        return [
+            dict(desc, flux_prompt=_translate_to_flux_prompt(desc.get('chinese_description', '')))
+            for desc in visual_descriptions
+        ]
     
-    def generate_flux_prompts_batch(self, visual_descriptions: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    async def generate_flux_prompts_batch(self, visual_descriptions: List[Dict[str, str]],
+                                          max_scenes_per_request: int = 32) -> List[Dict[str, str]]:
         """
         生成visual descriptions中的flux prompts（直接调用LLM生成方法）
         
+        场景数超过max_scenes_per_request时切成多段并发请求，
+        避免单个长请求的生成时间成为整个分集的瓶颈。
+        
         Args:
             visual_descriptions: 包含中文描述的视觉描述列表
+            max_scenes_per_request: 每个请求的场景数上限
             
         Returns:
             List[Dict[str, str]]: 生成flux_prompt后的视觉描述列表
         """
-        print(f"🤖 开始使用LLM直接生成 {len(visual_descriptions)} 个图像prompt...")
+        logger.info(f"🤖 开始使用LLM直接生成 {len(visual_descriptions)} 个图像prompt...")
+        
+        if len(visual_descriptions) > max_scenes_per_request:
+            # 按多分集的方式分段（只有一个分集），各段失败时单独走备用流程
+            results = await self.enhance_flux_prompts_multishot(
+                {"shot": visual_descriptions}, max_scenes_per_request
+            )
+            logger.info(f"🎯 所有prompt生成完成！")
+            return results["shot"]
         
-        enhanced_descriptions = self.enhance_flux_prompts_batch(visual_descriptions)
+        enhanced_descriptions, used_fallback = await self.enhance_flux_prompts_batch(visual_descriptions)
         
-        if enhanced_descriptions == visual_descriptions:
-            print(f"⚠️  LLM生成失败，使用备用方法")
+        if used_fallback:
+            logger.warning(f"⚠️  LLM生成失败，使用备用方法")
         else:
-            print(f"🎯 所有prompt生成完成！")
+            logger.info(f"🎯 所有prompt生成完成！")
         
         return enhanced_descriptions
 
@@ -281,7 +822,7 @@ class PromptEnhancer:
 class StoryboardProcessor:
     """故事板处理器"""
     
-    def __init__(self, shot_name: str = None, generate_audio: bool = True, storyboard_dir: str = "storyboard", assets_dir: str = "assets", enhance_prompts: bool = True):
+    def __init__(self, shot_name: str = None, generate_audio: bool = True, storyboard_dir: str = "storyboard", assets_dir: str = "assets", enhance_prompts: bool = True, audio_workers: int = 8, force: bool = False):
         """
         初始化处理器
         
@@ -291,10 +832,14 @@ class StoryboardProcessor:
             storyboard_dir: storyboard文件目录
             assets_dir: 资源文件目录
             enhance_prompts: 是否使用LLM增强图像prompts（默认为True）
+            audio_workers: 每个分集并发合成配音的线程数（默认为8）
+            force: 忽略指纹和校验文件，重新生成ComfyUI prompts和字幕文件（默认为False）
         """
         self.shot_name = shot_name
         self.generate_audio = generate_audio
         self.enhance_prompts = enhance_prompts
+        self.audio_workers = max(1, audio_workers)
+        self.force = force
         self.storyboard_dir = Path(storyboard_dir)
         self.assets_dir = Path(assets_dir)
         
@@ -306,29 +851,60 @@ class StoryboardProcessor:
         self.region = os.getenv('AZURE_SPEECH_REGION', 'switzerlandnorth')
         
         if self.generate_audio and not self.speech_key:
-            print("❌ 警告: 未找到 AZURE_SPEECH_KEY 环境变量，请检查 .env 文件")
+            logger.warning("❌ 警告: 未找到 AZURE_SPEECH_KEY 环境变量，请检查 .env 文件")
             self.generate_audio = False
         
-        # 初始化语音合成器
+        # 初始化语音合成器（不可用或初始化失败时为None）
+        self.tts = None
         if self.generate_audio and AZURE_SPEECH_AVAILABLE:
             try:
                 self.tts = AzureSpeechSynthesizer(self.speech_key, self.region)
-                print("✅ Azure语音合成器初始化成功")
+                logger.info("✅ Azure语音合成器初始化成功")
             except Exception as e:
-                print(f"❌ Azure语音合成器初始化失败: {e}")
+                logger.error(f"❌ Azure语音合成器初始化失败: {e}")
                 self.generate_audio = False
         
+        # 多分集合并生成prompts的任务（批量处理时使用）
+        self._prompt_batch = None
+        
+        # 故事板文件列表缓存
+        self._storyboard_files: Optional[List[Path]] = None
+        
+        # 本次运行中已确认存在的输出目录，避免重复mkdir
+        self._ensured_dirs: set = set()
+        
+        # 音频时长缓存: {音频路径: (mtime, size, duration)}
+        self._duration_cache: Dict[str, Tuple[float, int, float]] = {}
+        
         # 初始化prompt增强器
         self.prompt_enhancer = None
         if self.enhance_prompts and OPENAI_AVAILABLE:
             try:
-                self.prompt_enhancer = PromptEnhancer()
-                print("✅ LLM prompt增强器初始化成功")
+                self.prompt_enhancer = PromptEnhancer(cache_path=self.assets_dir / "_prompt_cache.json")
+                logger.info("✅ LLM prompt增强器初始化成功")
             except Exception as e:
-                print(f"❌ LLM prompt增强器初始化失败: {e}")
-                print(f"将跳过prompt增强功能")
+                logger.error(f"❌ LLM prompt增强器初始化失败: {e}")
+                logger.info(f"将跳过prompt增强功能")
                 self.enhance_prompts = False
     
+    def _shot_folder(self, shot_name: str, kind: str, create: bool = False) -> Path:
+        """
+        获取分集的输出目录（images/audios/subtitles）
+        
+        Args:
+            shot_name: 分集名称，如 'shot_01'
+            kind: 目录名称
+            create: 是否确保目录存在（每个目录只在第一次时调用mkdir）
+            
+        Returns:
+            Path: 目录路径
+        """
+        folder = self.assets_dir / shot_name / kind
+        if create and folder not in self._ensured_dirs:
+            folder.mkdir(parents=True, exist_ok=True)
+            self._ensured_dirs.add(folder)
+        return folder
+    
     def get_storyboard_files(self) -> List[Path]:
         """
         获取要处理的故事板文件列表
@@ -336,15 +912,37 @@ class StoryboardProcessor:
         Returns:
             list: 故事板文件路径列表
         """
-        storyboard_files = []
+        # 同一处理器重复调用process()时直接使用缓存的列表
+        if self._storyboard_files:
+            return self._storyboard_files
         
-        # 处理所有故事板文件
-        pattern = "*_storyboard.json"
-        for storyboard_path in self.storyboard_dir.glob(pattern):
-            storyboard_files.append(storyboard_path)
+        self._storyboard_files = self.list_storyboard_files(self.storyboard_dir)
+        return self._storyboard_files
+    
+    @staticmethod
+    def list_storyboard_files(storyboard_dir: Path) -> List[Path]:
+        """
+        列出目录中的故事板文件（不需要创建处理器，多进程模式的主进程直接调用）
+        
+        Args:
+            storyboard_dir: storyboard文件目录
+            
+        Returns:
+            list: 故事板文件路径列表
+        """
+        # 单次扫描目录，按文件名后缀过滤
+        storyboard_files = []
+        try:
+            with os.scandir(storyboard_dir) as entries:
+                storyboard_files = [
+                    Path(entry.path) for entry in entries
+                    if entry.name.endswith("_storyboard.json") and entry.is_file()
+                ]
+        except OSError:
+            pass
         
         if not storyboard_files:
-            print(f"❌ 在 {self.storyboard_dir} 中未找到任何故事板文件")
+            logger.error(f"❌ 在 {storyboard_dir} 中未找到任何故事板文件")
         
         return storyboard_files
     
@@ -362,10 +960,10 @@ class StoryboardProcessor:
         if not storyboard_path.exists():
             raise FileNotFoundError(f"Storyboard file not found: {storyboard_path}")
         
-        with open(storyboard_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return _load_json(storyboard_path)
     
-    def translate_to_flux_prompt(self, chinese_desc: str) -> str:
+    @staticmethod
+    def translate_to_flux_prompt(chinese_desc: str) -> str:
         """
         将中文视觉描述转换为基础的Flux风格英文prompt（备用方案）
         
@@ -375,20 +973,7 @@ class StoryboardProcessor:
         Returns:
             英文Flux风格prompt
         """
-        # 简化的备用方案：直接使用中文描述生成基础prompt
-        # 这个方法主要在LLM不可用时作为最后备用
-        
-        # 基本清理：移除一些明显的中文标点
-        cleaned_desc = chinese_desc.replace("，", ", ").replace("。", ". ")
-        
-        # 生成基础的Flux风格prompt
-        flux_style_prefix = "Cinematic shot, high quality, detailed rendering, "
-        flux_style_suffix = ", dramatic lighting, masterpiece, best quality, ultra detailed, 8k resolution"
-        
-        # 构建最终的基础Flux prompt
-        flux_prompt = f"{flux_style_prefix}{cleaned_desc}{flux_style_suffix}"
-        
-        return flux_prompt
+        return _translate_to_flux_prompt(chinese_desc)
     
     def generate_comfyui_prompts(self, enhanced_descriptions: List[Dict[str, str]], images_folder: Path) -> None:
         """
@@ -399,19 +984,61 @@ class StoryboardProcessor:
             images_folder: 图像文件夹路径
         """
         # 提取所有的flux_prompt
-        comfyui_prompts = []
-        for desc in enhanced_descriptions:
-            flux_prompt = desc.get('flux_prompt', '')
-            if flux_prompt:
-                comfyui_prompts.append(flux_prompt)
+        comfyui_prompts = [desc['flux_prompt'] for desc in enhanced_descriptions if desc.get('flux_prompt')]
+        self._write_comfyui_prompts(comfyui_prompts, images_folder, images_folder / "flux_prompts.json")
+    
+    def _write_comfyui_prompts(self, comfyui_prompts: List[str], images_folder: Path, source_path: Path) -> None:
+        """
+        保存ComfyUI专用的prompts数组，并在 comfyui_prompts.json.md5 中记录来源prompts文件的MD5
         
-        # 保存ComfyUI prompts文件
+        Args:
+            comfyui_prompts: ComfyUI prompts列表
+            images_folder: 图像文件夹路径
+            source_path: 生成ComfyUI prompts所依据的prompts文件
+        """
         comfyui_prompts_path = images_folder / "comfyui_prompts.json"
-        with open(comfyui_prompts_path, 'w', encoding='utf-8') as f:
-            json.dump(comfyui_prompts, f, ensure_ascii=False, indent=2)
+        _write_json(comfyui_prompts_path, comfyui_prompts)
+        if source_path.exists():
+            (images_folder / "comfyui_prompts.json.md5").write_text(_file_md5(source_path), encoding='utf-8')
+        
+        logger.info(f"已生成ComfyUI prompts文件: {comfyui_prompts_path}")
+        logger.info(f"包含 {len(comfyui_prompts)} 个图像生成prompt")
+    
+    def _emit_prompts(self, enhanced_descriptions: List[Dict[str, str]], images_folder: Path, prompts_path: Path,
+                      comfyui_prompts: Optional[List[str]] = None) -> None:
+        """
+        保存prompts文件，同时写出ComfyUI专用的prompts文件
+        
+        Args:
+            enhanced_descriptions: 包含flux_prompt的描述列表
+            images_folder: 图像文件夹路径
+            prompts_path: prompts文件路径
+            comfyui_prompts: 已在构建描述时收集好的ComfyUI prompts，为None时从描述中提取
+        """
+        if comfyui_prompts is None:
+            comfyui_prompts = [desc['flux_prompt'] for desc in enhanced_descriptions if desc.get('flux_prompt')]
+        _write_json_array(prompts_path, enhanced_descriptions)
+        self._write_comfyui_prompts(comfyui_prompts, images_folder, prompts_path)
+    
+    @staticmethod
+    def _collect_scene_field(storyboard_data: Dict[str, Any], field: str, key: str = None) -> List[Dict[str, Any]]:
+        """
+        按顺序收集 preview_scenes 和 main_scenes 中含有指定字段的场景
         
-        print(f"已生成ComfyUI prompts文件: {comfyui_prompts_path}")
-        print(f"包含 {len(comfyui_prompts)} 个图像生成prompt")
+        Args:
+            storyboard_data: 故事板数据
+            field: 场景中的字段名
+            key: 输出中使用的字段名，默认与field相同
+            
+        Returns:
+            [{"scene_number": ..., key: 字段值}, ...]
+        """
+        key = key or field
+        return [
+            {"scene_number": scene.get("scene_number"), key: scene[field]}
+            for scene in chain(storyboard_data.get("preview_scenes", ()), storyboard_data.get("main_scenes", ()))
+            if field in scene
+        ]
     
     def process_visual_descriptions(self, storyboard_data: Dict[str, Any]) -> List[Dict[str, str]]:
         """
@@ -423,29 +1050,7 @@ class StoryboardProcessor:
         Returns:
             视觉描述列表
         """
-        visual_descriptions = []
-        
-        # 处理 preview_scenes
-        for scene in storyboard_data.get("preview_scenes", []):
-            if "visual_description" in scene:
-                chinese_desc = scene["visual_description"]
-                
-                visual_descriptions.append({
-                    "scene_number": scene.get("scene_number"),
-                    "chinese_description": chinese_desc
-                })
-        
-        # 处理 main_scenes
-        for scene in storyboard_data.get("main_scenes", []):
-            if "visual_description" in scene:
-                chinese_desc = scene["visual_description"]
-                
-                visual_descriptions.append({
-                    "scene_number": scene.get("scene_number"),
-                    "chinese_description": chinese_desc
-                })
-        
-        return visual_descriptions
+        return self._collect_scene_field(storyboard_data, "visual_description", "chinese_description")
     
     def process_storylines(self, storyboard_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -457,117 +1062,221 @@ class StoryboardProcessor:
         Returns:
             故事线列表
         """
-        storylines = []
-        
-        # 处理 preview_scenes
-        for scene in storyboard_data.get("preview_scenes", []):
-            if "storyline" in scene:
-                storylines.append({
-                    "scene_number": scene.get("scene_number"),
-                    "storyline": scene["storyline"]
-                })
+        return self._collect_scene_field(storyboard_data, "storyline")
+    
+    def _scan_audio_status(self, storylines: List[Dict[str, Any]], shot_name: str) -> Tuple[Dict[Any, Path], List[Any]]:
+        """
+        一次读取音频目录，检查每个场景的音频文件是否存在
         
-        # 处理 main_scenes
-        for scene in storyboard_data.get("main_scenes", []):
-            if "storyline" in scene:
-                storylines.append({
-                    "scene_number": scene.get("scene_number"),
-                    "storyline": scene["storyline"]
-                })
+        Args:
+            storylines: 故事线列表
+            shot_name: 分集名称，如 'shot_01'
+            
+        Returns:
+            Tuple: ({场景编号: 已存在的音频路径}, [缺失音频的场景编号])
+        """
+        audio_folder = self._shot_folder(shot_name, "audios")
+        existing_names = _dir_file_names(audio_folder)
         
-        return storylines
+        existing = {}
+        missing = []
+        for storyline in storylines:
+            scene_number = storyline["scene_number"]
+            audio_filename = f"{shot_name}_{scene_number}.wav"
+            if audio_filename in existing_names:
+                existing[scene_number] = audio_folder / audio_filename
+            else:
+                missing.append(scene_number)
+        return existing, missing
     
-    def generate_audio_files(self, storylines: List[Dict[str, Any]], shot_name: str) -> None:
+    def generate_audio_files(self, storylines: List[Dict[str, Any]], shot_name: str, max_workers: int = None,
+                             missing_scenes: Optional[List[Any]] = None) -> List[Any]:
         """
-        为storylines生成配音文件
+        为storylines生成配音文件（多个场景的合成请求在线程池中并发进行）
         
         Args:
             storylines: 故事线列表
             shot_name: 分集名称，如 'shot_01'
+            max_workers: 并发合成的线程数，为None时使用audio_workers
+            missing_scenes: 已知缺失音频的场景编号，为None时扫描音频目录确定
+            
+        Returns:
+            list: 生成失败的场景编号
         """
         if not self.generate_audio or not AZURE_SPEECH_AVAILABLE:
-            print("跳过音频生成")
-            return
+            logger.info("跳过音频生成")
+            return list(missing_scenes or [])
         
-        print(f"开始生成 {shot_name} 的配音文件，使用音色: {VoiceType.YUNXI.value}")
+        logger.info(f"开始生成 {shot_name} 的配音文件，使用音色: {VoiceType.YUNXI.value}")
         
         # 确保音频目录存在
-        audio_folder = self.assets_dir / shot_name / "audios"
-        audio_folder.mkdir(parents=True, exist_ok=True)
+        audio_folder = self._shot_folder(shot_name, "audios", create=True)
+        
+        if missing_scenes is None:
+            _, missing_scenes = self._scan_audio_status(storylines, shot_name)
+        missing_set = set(missing_scenes)
         
         generated_count = 0
         skipped_count = 0
+        failed_scenes = []
+        pending = []
         
         for storyline in storylines:
             scene_number = storyline["scene_number"]
-            text = storyline["storyline"]
             
             # 生成目标音频文件名（符合项目命名规则）
             target_audio_filename = f"{shot_name}_{scene_number}.wav"
-            target_audio_path = audio_folder / target_audio_filename
             
-            # 检查目标文件是否已存在
-            if target_audio_path.exists():
-                print(f"⏭️  {shot_name} 场景 {scene_number} 音频已存在，跳过生成: {target_audio_filename}")
+            # 跳过已存在的音频
+            if scene_number not in missing_set:
+                logger.info(f"⏭️  {shot_name} 场景 {scene_number} 音频已存在，跳过生成: {target_audio_filename}")
                 skipped_count += 1
                 continue
             
-            try:
-                print(f"🎵 正在生成 {shot_name} 场景 {scene_number} 的配音...")
-                self.tts.synthesize_text(
-                    text=text,
-                    voice=VoiceType.YUNXI,
-                    output_file=str(target_audio_path)
-                )
-                print(f"✅ 已生成: {target_audio_filename}")
-                generated_count += 1
-                
-            except Exception as e:
-                print(f"❌ {shot_name} 场景 {scene_number} 配音生成失败: {e}")
-        
-        print(f"{shot_name} 配音生成完成! 新生成: {generated_count} 个, 跳过: {skipped_count} 个")
-        print(f"音频文件保存在: {audio_folder}")
+            pending.append((scene_number, storyline["storyline"], audio_folder / target_audio_filename))
+        
+        if pending:
+            logger.info(f"🎵 正在并发生成 {shot_name} 的 {len(pending)} 个场景配音...")
+            max_workers = max_workers or self.audio_workers
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+                futures = {
+                    executor.submit(self.tts.synthesize_text, text, VoiceType.YUNXI, str(target_audio_path)):
+                        (scene_number, target_audio_path.name)
+                    for scene_number, text, target_audio_path in pending
+                }
+                for future in as_completed(futures):
+                    scene_number, target_audio_filename = futures[future]
+                    try:
+                        future.result()
+                        logger.info(f"✅ 已生成: {target_audio_filename}")
+                        generated_count += 1
+                    except Exception as e:
+                        logger.error(f"❌ {shot_name} 场景 {scene_number} 配音生成失败: {e}")
+                        failed_scenes.append(scene_number)
+        
+        logger.info(f"{shot_name} 配音生成完成! 新生成: {generated_count} 个, 跳过: {skipped_count} 个")
+        logger.info(f"音频文件保存在: {audio_folder}")
+        return failed_scenes
+    
+    # 中英文标点符号替换表（预先构建，str.translate 单次C循环完成替换）
+    _PUNCT_TABLE = str.maketrans(dict.fromkeys(
+        '，。！？：；「」『』（）【】《》〈〉、'
+        ',.!?:;"\'()[]{}<>/|~`@#$%^&*+=_-',
+        ' '
+    ))
     
     def remove_punctuation(self, text: str) -> str:
         """去除标点符号"""
-        # 定义中英文标点符号模式
-        punctuation_pattern = r'[，。！？：；""''「」『』（）【】《》〈〉、,.!?:;"\'()\\[\\]{}<>/|~`@#$%^&*+=_-]'
-        # 去除标点符号，用空格替换
-        clean_text = re.sub(punctuation_pattern, ' ', text)
+        # 标点符号用空格替换
+        clean_text = text.translate(self._PUNCT_TABLE)
         # 去除多余的空格
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-        return clean_text
+        return ' '.join(clean_text.split())
     
     def split_into_chunks(self, text: str, max_chars_per_chunk: int = 15) -> List[str]:
-        """将文本分块，每块不超过指定字符数"""
+        """将文本分块，每块不超过指定字符数（单个词超长时独占一块）"""
         # 先按空格分割成词
         words = text.split()
         chunks = []
-        current_chunk = ""
         
-        for word in words:
-            # 检查添加这个词后是否会超过限制
-            test_chunk = current_chunk + (" " if current_chunk else "") + word
-            
-            if len(test_chunk) <= max_chars_per_chunk:
-                # 不超过限制，添加这个词
-                current_chunk = test_chunk
+        # 只累计当前块的长度，确定边界后每块拼接一次
+        start = 0
+        current_len = 0
+        for i, word in enumerate(words):
+            if i == start:
+                current_len = len(word)
+            elif current_len + 1 + len(word) <= max_chars_per_chunk:
+                # 不超过限制，加上空格和这个词
+                current_len += 1 + len(word)
             else:
-                # 超过限制，保存当前块并开始新块
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                current_chunk = word
+                # 超过限制，保存当前块并从这个词开始新块
+                chunks.append(" ".join(words[start:i]))
+                start = i
+                current_len = len(word)
         
         # 添加最后一个块
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        if start < len(words):
+            chunks.append(" ".join(words[start:]))
             
         return chunks
     
-    def get_audio_duration(self, audio_path: str) -> float:
-        """获取音频文件的时长（秒）"""
+    def get_audio_duration(self, audio_path: str, stat: Optional[os.stat_result] = None) -> float:
+        """获取音频文件的时长（秒），文件未变化时直接使用缓存
+        
+        Args:
+            audio_path: 音频文件路径
+            stat: 已获取的文件状态，为None时重新获取
+        """
+        if stat is None:
+            try:
+                stat = os.stat(audio_path)
+            except OSError:
+                stat = None
+        
+        if stat is not None:
+            cached = self._duration_cache.get(audio_path)
+            if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+                return cached[2]
+        
+        duration = self._read_audio_duration(audio_path)
+        if duration is None:
+            return 3.0  # 默认3秒
+        
+        if stat is not None:
+            self._duration_cache[audio_path] = (stat.st_mtime, stat.st_size, duration)
+        return duration
+    
+    def _batch_durations(self, audio_stats: Dict[Path, os.stat_result]) -> Dict[Path, float]:
+        """
+        一次性获取多个音频文件的时长（复用已获取的文件状态）
+        
+        Args:
+            audio_stats: {音频路径: 文件状态}，只包含存在的文件
+            
+        Returns:
+            Dict[Path, float]: {音频路径: 时长}
+        """
+        return {
+            audio_path: self.get_audio_duration(str(audio_path), stat)
+            for audio_path, stat in audio_stats.items()
+        }
+    
+    @staticmethod
+    def _read_wav_header_duration(audio_path: str) -> Optional[float]:
+        """直接解析WAV头获取时长（逐个遍历RIFF块定位fmt和data），格式不符时返回None"""
+        with open(audio_path, 'rb') as f:
+            header = f.read(4096)
+            f.seek(0, os.SEEK_END)
+            file_size = f.tell()
+        
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return None
+        
+        sample_rate = block_align = 0
+        offset = 12
+        while offset + 8 <= len(header):
+            chunk_id = header[offset:offset + 4]
+            chunk_size, = struct.unpack_from('<I', header, offset + 4)
+            if chunk_id == b'fmt ' and offset + 16 <= len(header):
+                sample_rate, = struct.unpack_from('<I', header, offset + 12)
+                block_align, = struct.unpack_from('<H', header, offset + 20)
+            elif chunk_id == b'data':
+                data_size = min(chunk_size, file_size - offset - 8)
+                if not sample_rate or not block_align or data_size < 0:
+                    return None
+                return (data_size // block_align) / float(sample_rate)
+            # RIFF块按偶数字节对齐
+            offset += 8 + chunk_size + (chunk_size & 1)
+        return None
+    
+    def _read_audio_duration(self, audio_path: str) -> Optional[float]:
+        """读取音频文件时长，全部方案失败时返回None"""
         try:
-            # 首选方案：使用wave库读取WAV文件
+            # 首选方案：直接解析WAV头
+            duration = self._read_wav_header_duration(audio_path)
+            if duration is not None:
+                return duration
+            
+            # 次选方案：使用wave库读取WAV文件
             import wave
             with wave.open(audio_path, 'r') as wav_file:
                 frames = wav_file.getnframes()
@@ -575,7 +1284,7 @@ class StoryboardProcessor:
                 duration = frames / float(rate)
                 return duration
         except Exception as e:
-            print(f"获取音频时长失败 (wave): {e}")
+            logger.info(f"获取音频时长失败 (wave): {e}")
             try:
                 # 备用方案：使用moviepy
                 from moviepy.editor import AudioFileClip
@@ -584,11 +1293,36 @@ class StoryboardProcessor:
                 audio_clip.close()
                 return duration
             except ImportError:
-                print("MoviePy未安装，使用默认时长")
+                logger.info("MoviePy未安装，使用默认时长")
             except Exception as e:
-                print(f"获取音频时长失败 (moviepy): {e}")
+                logger.info(f"获取音频时长失败 (moviepy): {e}")
         
-        return 3.0  # 默认3秒
+        return None
+    
+    def _load_duration_cache(self, audio_folder: Path) -> None:
+        """从 audios/_durations.json 载入音频时长缓存"""
+        cache_path = audio_folder / "_durations.json"
+        if not cache_path.exists():
+            return
+        try:
+            for filename, entry in _load_json(cache_path).items():
+                self._duration_cache[str(audio_folder / filename)] = tuple(entry)
+        except Exception as e:
+            logger.warning(f"⚠️  读取音频时长缓存失败: {e}")
+    
+    def _save_duration_cache(self, audio_folder: Path, audio_paths: List[Path]) -> None:
+        """将本分集音频的时长缓存写入 audios/_durations.json"""
+        entries = {}
+        for audio_path in audio_paths:
+            cached = self._duration_cache.get(str(audio_path))
+            if cached:
+                entries[audio_path.name] = list(cached)
+        if not entries:
+            return
+        try:
+            _write_json(audio_folder / "_durations.json", entries)
+        except Exception as e:
+            logger.warning(f"⚠️  保存音频时长缓存失败: {e}")
     
     def _ensure_audio_files_exist(self, storylines: List[Dict[str, Any]], shot_name: str) -> bool:
         """
@@ -601,68 +1335,69 @@ class StoryboardProcessor:
         Returns:
             bool: 所有音频文件是否最终都存在
         """
-        print(f"🔍 检查 {shot_name} 的音频文件状态...")
-        
-        # 音频文件目录
-        audio_folder = self.assets_dir / shot_name / "audios"
-        audio_folder.mkdir(parents=True, exist_ok=True)
+        logger.info(f"🔍 检查 {shot_name} 的音频文件状态...")
         
-        # 检查所有音频文件是否存在
-        missing_audio_files = []
-        expected_audio_files = []
+        # 确保音频文件目录存在
+        self._shot_folder(shot_name, "audios", create=True)
         
-        for storyline in storylines:
-            scene_number = storyline["scene_number"]
-            audio_filename = f"{shot_name}_{scene_number}.wav"
-            audio_path = audio_folder / audio_filename
-            expected_audio_files.append(audio_filename)
-            
-            if not audio_path.exists():
-                missing_audio_files.append(audio_filename)
+        # 一次扫描确定缺失的音频文件
+        existing, missing_scenes = self._scan_audio_status(storylines, shot_name)
         
-        if not missing_audio_files:
-            print(f"✅ 所有 {len(expected_audio_files)} 个音频文件都已存在")
+        if not missing_scenes:
+            logger.info(f"✅ 所有 {len(existing)} 个音频文件都已存在")
             return True
         
         # 有缺失的音频文件，开始生成
-        print(f"❌ 发现 {len(missing_audio_files)} 个音频文件缺失:")
-        for missing_file in missing_audio_files:
-            print(f"   - {missing_file}")
+        logger.warning(f"❌ 发现 {len(missing_scenes)} 个音频文件缺失:")
+        for scene_number in missing_scenes:
+            logger.info(f"   - {shot_name}_{scene_number}.wav")
         
         if not self.tts:
-            print(f"❌ Azure语音合成器未初始化，无法生成音频文件")
+            logger.error(f"❌ Azure语音合成器未初始化，无法生成音频文件")
             return False
         
-        print(f"🎵 开始生成缺失的音频文件...")
+        logger.info(f"🎵 开始生成缺失的音频文件...")
         
         try:
-            # 生成音频文件
-            self.generate_audio_files(storylines, shot_name)
-            print(f"✅ 音频生成完成")
-            
-            # 验证所有音频文件是否都已生成
-            print(f"🔍 验证音频文件生成结果...")
-            final_missing_files = []
-            for storyline in storylines:
-                scene_number = storyline["scene_number"]
-                audio_filename = f"{shot_name}_{scene_number}.wav"
-                audio_path = audio_folder / audio_filename
-                if not audio_path.exists():
-                    final_missing_files.append(audio_filename)
-            
-            if final_missing_files:
-                print(f"❌ 仍有 {len(final_missing_files)} 个音频文件生成失败:")
-                for missing_file in final_missing_files:
-                    print(f"   - {missing_file}")
+            # 生成音频文件（合成成功即写入文件，无需再次检查文件是否存在）
+            failed_scenes = self.generate_audio_files(storylines, shot_name, missing_scenes=missing_scenes)
+            logger.info(f"✅ 音频生成完成")
+            
+            if failed_scenes:
+                logger.error(f"❌ 仍有 {len(failed_scenes)} 个音频文件生成失败:")
+                for scene_number in failed_scenes:
+                    logger.info(f"   - {shot_name}_{scene_number}.wav")
                 return False
             else:
-                print(f"✅ 所有音频文件已成功生成并验证完成")
+                logger.info(f"✅ 所有音频文件已成功生成")
                 return True
                 
         except Exception as e:
-            print(f"❌ 音频生成过程中发生错误: {e}")
+            logger.error(f"❌ 音频生成过程中发生错误: {e}")
             return False
     
+    @staticmethod
+    def _stat_audio_files(audio_paths: List[Path]) -> Dict[Path, os.stat_result]:
+        """获取音频文件状态，不存在的文件不包含在结果中"""
+        stats = {}
+        for audio_path in audio_paths:
+            try:
+                stats[audio_path] = os.stat(audio_path)
+            except OSError:
+                pass
+        return stats
+    
+    @staticmethod
+    def _rst_fingerprint(storylines: List[Dict[str, Any]], audio_paths: List[Path],
+                         audio_stats: Dict[Path, os.stat_result]) -> str:
+        """根据故事线内容和音频文件状态（mtime、大小）计算RST输入指纹"""
+        audio_state = []
+        for audio_path in audio_paths:
+            stat = audio_stats.get(audio_path)
+            audio_state.append([stat.st_mtime, stat.st_size] if stat else None)
+        payload = _json_dumps({"lines": storylines, "audio": audio_state})
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
     def generate_complete_rst_file(self, storylines: List[Dict[str, Any]], shot_name: str) -> List[Dict]:
         """
         根据storylines生成完整的RST字幕文件
@@ -674,92 +1409,132 @@ class StoryboardProcessor:
         Returns:
             list: 包含所有片段时间信息的列表
         """
-        print(f"📝 开始生成 {shot_name} 的RST字幕文件...")
+        logger.info(f"📝 开始生成 {shot_name} 的RST字幕文件...")
         
         # 音频文件目录
-        audio_folder = self.assets_dir / shot_name / "audios"
+        audio_folder = self._shot_folder(shot_name, "audios")
+        audio_paths = [audio_folder / f"{shot_name}_{storyline['scene_number']}.wav" for storyline in storylines]
         
-        # 检查音频文件状态（只做最终确认，不生成）
-        missing_audio_files = []
-        for storyline in storylines:
-            scene_number = storyline["scene_number"]
-            audio_filename = f"{shot_name}_{scene_number}.wav"
-            audio_path = audio_folder / audio_filename
-            if not audio_path.exists():
-                missing_audio_files.append(audio_filename)
+        # 故事线和音频文件都未变化时直接使用上次生成的结果
+        subtitles_folder = self._shot_folder(shot_name, "subtitles")
+        final_rst_path = subtitles_folder / f"{shot_name}.rst"
+        fingerprint_path = subtitles_folder / ".rst_fingerprint"
+        audio_stats = self._stat_audio_files(audio_paths)
+        fingerprint = self._rst_fingerprint(storylines, audio_paths, audio_stats)
+        subtitle_names = _dir_file_names(subtitles_folder)
+        if not self.force and final_rst_path.name in subtitle_names and fingerprint_path.name in subtitle_names:
+            try:
+                previous = _load_json(fingerprint_path)
+                if previous.get("fingerprint") == fingerprint:
+                    logger.info(f"⏭️  {shot_name} 的故事线和音频均未变化，跳过RST字幕文件生成: {final_rst_path}")
+                    return previous["segments"]
+            except Exception as e:
+                logger.warning(f"⚠️  读取RST指纹文件失败: {e}")
         
+        # 一次性读取所有场景的音频时长（只做最终确认，不生成）
+        self._load_duration_cache(audio_folder)
+        durations = self._batch_durations(audio_stats)
+        
+        missing_audio_files = [audio_path.name for audio_path in audio_paths if audio_path not in durations]
         if missing_audio_files:
-            print(f"⚠️  发现 {len(missing_audio_files)} 个音频文件仍然缺失，将使用默认时长 3.0 秒")
+            logger.warning(f"⚠️  发现 {len(missing_audio_files)} 个音频文件仍然缺失，将使用默认时长 3.0 秒")
         else:
-            print(f"✅ 所有音频文件已就绪，使用实际音频时长")
+            logger.info(f"✅ 所有音频文件已就绪，使用实际音频时长")
         
         all_segments = []
+        segment_logs = [] if logger.isEnabledFor(logging.INFO) else None
         current_start_time = 0.0
         
         # 处理每个场景的storyline
-        for i, storyline in enumerate(storylines, 1):
+        for storyline, audio_path in zip(storylines, audio_paths):
             scene_number = storyline["scene_number"]
             storyline_text = storyline["storyline"]
             
-            # 构建对应的音频文件路径
-            audio_filename = f"{shot_name}_{scene_number}.wav"
-            audio_path = audio_folder / audio_filename
-            
-            # 获取音频时长
-            if audio_path.exists():
-                scene_duration = self.get_audio_duration(str(audio_path))
-            else:
-                # 使用默认时长（错误信息已在上面显示过）
-                scene_duration = 3.0
+            # 获取音频时长，缺失的音频使用默认时长（错误信息已在上面显示过）
+            scene_duration = durations.get(audio_path, 3.0)
             
             # 预处理字幕文本
             clean_text = self.remove_punctuation(storyline_text)
             
-            # 文本分块
-            chunks = self.split_into_chunks(clean_text)
-            
-            # 如果没有分块，使用原文
-            if not chunks:
-                chunks = [clean_text or storyline_text]
+            # 文本分块，没有分块时使用原文
+            chunks = self.split_into_chunks(clean_text) or [clean_text or storyline_text]
             
-            # 计算每个块的时间分配
-            chunk_duration = scene_duration / len(chunks) if chunks else scene_duration
-            
-            # 为每个块创建时间段
-            for j, chunk in enumerate(chunks):
-                segment_start = current_start_time + j * chunk_duration
-                segment_end = current_start_time + (j + 1) * chunk_duration
-                
-                segment_info = {
+            # 场景时长在各块之间均匀分配，每块的结束时间即下一块的开始时间
+            chunk_duration = scene_duration / len(chunks)
+            segment_start = current_start_time
+            for j, chunk in enumerate(chunks, 1):
+                segment_end = current_start_time + j * chunk_duration
+                all_segments.append({
                     'scene': scene_number,
-                    'chunk': j + 1,
+                    'chunk': j,
                     'text': chunk,
                     'start_time': segment_start,
                     'end_time': segment_end,
                     'duration': chunk_duration
-                }
-                all_segments.append(segment_info)
-                print(f"  {shot_name} 场景{scene_number}_片段{j+1}: {segment_start:.2f}s-{segment_end:.2f}s | {chunk}")
+                })
+                if segment_logs is not None:
+                    segment_logs.append(f"  {shot_name} 场景{scene_number}_片段{j}: {segment_start:.2f}s-{segment_end:.2f}s | {chunk}")
+                segment_start = segment_end
             
             # 更新当前开始时间
             current_start_time += scene_duration
         
+        # 片段明细合并成一条日志输出
+        if segment_logs:
+            logger.info("\n".join(segment_logs))
+        
+        self._save_duration_cache(audio_folder, list(durations))
+        
         # 生成完整的RST内容
         total_duration = current_start_time
         rst_content = self.generate_complete_rst_content(all_segments, total_duration)
         
         # 保存RST文件到subtitles目录
-        subtitles_folder = self.assets_dir / shot_name / "subtitles"
-        subtitles_folder.mkdir(parents=True, exist_ok=True)
-        final_rst_path = subtitles_folder / f"{shot_name}.rst"
-        with open(final_rst_path, 'w', encoding='utf-8') as f:
-            f.write(rst_content)
+        self._shot_folder(shot_name, "subtitles", create=True)
+        final_rst_path.write_text(rst_content, encoding='utf-8')
+        
+        # 记录本次输入的指纹和片段信息，供下次运行比对
+        _write_json(fingerprint_path, {"fingerprint": fingerprint, "segments": all_segments})
         
-        print(f"{shot_name} 完整RST文件已保存到: {final_rst_path}")
-        print(f"总时长: {total_duration:.2f}s, 总片段数: {len(all_segments)}")
+        logger.info(f"{shot_name} 完整RST文件已保存到: {final_rst_path}")
+        logger.info(f"总时长: {total_duration:.2f}s, 总片段数: {len(all_segments)}")
         
         return all_segments
     
+    # RST字幕片段模板（按片段信息字典格式化）
+    _RST_SEGMENT_TEMPLATE = """
+.. subtitle:: 场景{scene:02d}_片段{chunk:02d}
+   :start_time: {start_time:.2f}
+   :end_time: {end_time:.2f}
+   :duration: {duration:.2f}
+   :text: {text}
+
+"""
+    
+    # RST文件结尾的样式配置和生成信息
+    _RST_FOOTER = """
+
+样式配置
+--------
+
+.. style_config::
+   :font_family: C:/Windows/Fonts/msyh.ttc
+   :font_size: 70
+   :font_color: #FFFFFF
+   :stroke_width: 3
+   :stroke_color: #000000
+   :position: bottom_third
+
+生成信息
+--------
+
+:生成工具: storyboard_processor.py
+:基于内容: storyline
+:分块规则: 最大15字符每块
+:时间分配: 基于音频文件时长均匀分配
+
+"""
+    
     def generate_complete_rst_content(self, segments: List[Dict], total_duration: float) -> str:
         """
         生成完整的RST内容
@@ -771,7 +1546,7 @@ class StoryboardProcessor:
         Returns:
             str: RST格式的内容
         """
-        rst_content = f"""完整视频字幕文件
+        header = f"""完整视频字幕文件
 ==================
 
 :创建时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -786,63 +1561,76 @@ class StoryboardProcessor:
 
 """
         
-        for segment in segments:
-            rst_content += f"""
-.. subtitle:: 场景{segment['scene']:02d}_片段{segment['chunk']:02d}
-   :start_time: {segment['start_time']:.2f}
-   :end_time: {segment['end_time']:.2f}
-   :duration: {segment['duration']:.2f}
-   :text: {segment['text']}
-
-"""
-        
-        rst_content += f"""
-
-样式配置
---------
-
-.. style_config::
-   :font_family: C:/Windows/Fonts/msyh.ttc
-   :font_size: 70
-   :font_color: #FFFFFF
-   :stroke_width: 3
-   :stroke_color: #000000
-   :position: bottom_third
-
-生成信息
---------
-
-:生成工具: storyboard_processor.py
-:基于内容: storyline
-:分块规则: 最大15字符每块
-:时间分配: 基于音频文件时长均匀分配
-
-"""
+        # 各片段先放入列表，最后一次性拼接
+        template = self._RST_SEGMENT_TEMPLATE
+        parts = [header]
+        parts.extend(template.format_map(segment) for segment in segments)
+        parts.append(self._RST_FOOTER)
         
-        return rst_content
+        return "".join(parts)
     
-    def process(self, shot_name: str = None) -> None:
+    async def process(self, shot_name: str = None) -> None:
         """
-        执行完整的处理流程
+        执行完整的处理流程（在事件循环中运行，如 asyncio.run(processor.process())）
         
         Args:
             shot_name: 特定分集名称，如 'shot_01'。如果为None，则处理所有分集
         """
-        if shot_name:
-            # 处理特定分集
-            self.process_single_shot(shot_name)
-        else:
-            # 批量处理所有分集
-            storyboard_files = self.get_storyboard_files()
-            if not storyboard_files:
-                print("未找到任何故事板文件")
-                return
-            
-            print(f"发现 {len(storyboard_files)} 个故事板文件，开始批量处理...")
-            for storyboard_file in storyboard_files:
-                shot_name = storyboard_file.stem.replace('_storyboard', '')
-                self.process_single_shot(shot_name)
-                print("-" * 50)
+        try:
+            if shot_name:
+                # 处理特定分集
+                await self.aprocess_single_shot(shot_name)
+            else:
+                # 批量处理所有分集
+                storyboard_files = self.get_storyboard_files()
+                if not storyboard_files:
+                    logger.info("未找到任何故事板文件")
+                    return
+                
+                logger.info(f"发现 {len(storyboard_files)} 个故事板文件，开始并发处理...")
+                shot_names = [f.stem.replace('_storyboard', '') for f in storyboard_files]
+                await self.aprocess_shots(shot_names)
+        finally:
+            # 在同一事件循环中关闭LLM客户端的连接池
+            if self.prompt_enhancer:
+                await self.prompt_enhancer.aclose()
+    
+    async def aprocess_shots(self, shot_names: List[str]) -> None:
+        """
+        并发处理多个分集（LLM请求和配音合成在分集之间重叠进行）
+        
+        Args:
+            shot_names: 分集名称列表
+        """
+        # 需要新生成prompts的分集合并为分块的LLM请求（并发进行），各分集等待同一个任务
+        if self.enhance_prompts and self.prompt_enhancer:
+            pending_shots = {}
+            for name in shot_names:
+                if "flux_prompts.json" not in _dir_file_names(self._shot_folder(name, "images")):
+                    pending_shots[name] = self.process_visual_descriptions(self.load_storyboard(name))
+            if pending_shots:
+                self._prompt_batch = asyncio.ensure_future(
+                    self.prompt_enhancer.enhance_flux_prompts_multishot(pending_shots)
+                )
+        
+        try:
+            results = await asyncio.gather(
+                *(self.aprocess_single_shot(name) for name in shot_names),
+                return_exceptions=True
+            )
+        finally:
+            # 合并请求的结果只属于这一批分集，不能留给之后的process()调用
+            if self._prompt_batch is not None and not self._prompt_batch.done():
+                self._prompt_batch.cancel()
+            self._prompt_batch = None
+        
+        errors = [(name, r) for name, r in zip(shot_names, results) if isinstance(r, Exception)]
+        for name, error in errors:
+            logger.error(f"❌ {name} 处理失败: {error}")
+        logger.info("-" * 50)
+        logger.info(f"批量处理完成: 成功 {len(shot_names) - len(errors)} 个, 失败 {len(errors)} 个")
+        if errors:
+            raise errors[0][1]
     
     def process_single_shot(self, shot_name: str) -> None:
         """
@@ -851,103 +1639,198 @@ class StoryboardProcessor:
         Args:
             shot_name: 分集名称，如 'shot_01'
         """
-        print(f"正在处理故事板: {shot_name}")
-        
-        # 加载故事板数据
-        storyboard_data = self.load_storyboard(shot_name)
+        asyncio.run(self.process(shot_name))
+    
+    async def _enhance_and_save(self, shot_name: str, storyboard_data: Dict[str, Any]) -> Optional[List[Dict[str, str]]]:
+        """
+        生成（或加载已有的）图像prompts并保存prompts文件
         
+        Args:
+            shot_name: 分集名称，如 'shot_01'
+            storyboard_data: 故事板数据
+            
+        Returns:
+            list: 包含flux_prompt的视觉描述列表；现有文件均为最新、未加载时返回None
+        """
         # 处理视觉描述（只提取中文描述）
         visual_descriptions = self.process_visual_descriptions(storyboard_data)
-        images_folder = self.assets_dir / shot_name / "images"
-        images_folder.mkdir(parents=True, exist_ok=True)
+        images_folder = self._shot_folder(shot_name, "images", create=True)
         
-        # 检查是否已经存在增强后的prompts文件
+        # 检查是否已经存在增强后的prompts文件（一次扫描目录，代替逐个文件stat）
         flux_prompts_path = images_folder / "flux_prompts.json"
+        image_names = _dir_file_names(images_folder)
         
-        if flux_prompts_path.exists() and not self.enhance_prompts:
-            # 如果文件存在但禁用了增强功能，直接加载现有文件
-            print(f"📄 发现现有的flux prompts文件: {flux_prompts_path}")
-            with open(flux_prompts_path, 'r', encoding='utf-8') as f:
-                enhanced_descriptions = json.load(f)
-            print(f"已加载现有的flux图像生成prompts")
+        if flux_prompts_path.name in image_names:
+            logger.info(f"📄 发现现有的flux prompts文件: {flux_prompts_path}")
+            if self.enhance_prompts:
+                logger.info(f"🔄 跳过LLM调用，使用现有文件")
             
-            # 检查并生成ComfyUI prompts文件
+            # ComfyUI prompts文件由当前的flux prompts生成时无需解析JSON
             comfyui_prompts_path = images_folder / "comfyui_prompts.json"
-            if not comfyui_prompts_path.exists():
-                self.generate_comfyui_prompts(enhanced_descriptions, images_folder)
-            
-        elif flux_prompts_path.exists() and self.enhance_prompts:
-            # 如果文件存在且启用了增强功能，询问是否跳过
-            print(f"📄 发现现有的flux prompts文件: {flux_prompts_path}")
-            print(f"🔄 跳过LLM调用，使用现有文件")
-            with open(flux_prompts_path, 'r', encoding='utf-8') as f:
-                enhanced_descriptions = json.load(f)
-            print(f"已加载现有的flux图像生成prompts")
-            
-            # 检查并生成ComfyUI prompts文件
-            comfyui_prompts_path = images_folder / "comfyui_prompts.json"
-            if not comfyui_prompts_path.exists():
-                self.generate_comfyui_prompts(enhanced_descriptions, images_folder)
+            checksum_path = images_folder / "comfyui_prompts.json.md5"
+            if (not self.force and comfyui_prompts_path.name in image_names and checksum_path.name in image_names
+                    and checksum_path.read_text(encoding='utf-8').strip() == _file_md5(flux_prompts_path)):
+                logger.info(f"⏭️  ComfyUI prompts文件与flux prompts一致，跳过重新生成")
+                return None
+            
+            enhanced_descriptions = _load_json(flux_prompts_path)
+            logger.info(f"已加载现有的flux图像生成prompts")
+            
+            # 重新生成缺失或过期的ComfyUI prompts文件
+            self.generate_comfyui_prompts(enhanced_descriptions, images_folder)
             
         else:
             # 需要生成新的prompts
             if self.enhance_prompts and self.prompt_enhancer:
-                # 使用LLM直接生成prompts
-                enhanced_descriptions = self.prompt_enhancer.generate_flux_prompts_batch(visual_descriptions)
-                
-                # 保存生成后的prompts
-                with open(flux_prompts_path, 'w', encoding='utf-8') as f:
-                    json.dump(enhanced_descriptions, f, ensure_ascii=False, indent=2)
-                print(f"已保存LLM生成的图像prompts: {flux_prompts_path}")
+                # 使用LLM直接生成prompts（批量处理时取多分集合并请求的结果）
+                enhanced_descriptions = None
+                if self._prompt_batch is not None:
+                    enhanced_descriptions = (await self._prompt_batch).get(shot_name)
+                if enhanced_descriptions is None:
+                    enhanced_descriptions = await self.prompt_enhancer.generate_flux_prompts_batch(visual_descriptions)
                 
-                # 生成ComfyUI专用的prompts文件
-                self.generate_comfyui_prompts(enhanced_descriptions, images_folder)
+                # 保存生成后的prompts和ComfyUI专用的prompts文件
+                self._emit_prompts(enhanced_descriptions, images_folder, flux_prompts_path)
+                logger.info(f"已保存LLM生成的图像prompts: {flux_prompts_path}")
                 
             else:
                 # 如果禁用了增强或初始化失败，使用备用方法
-                print("⚠️  LLM生成被禁用或初始化失败，使用备用翻译方法")
-                enhanced_descriptions = []
-                for desc in visual_descriptions:
-                    chinese_desc = desc.get('chinese_description', '')
-                    fallback_prompt = self.translate_to_flux_prompt(chinese_desc)
-                    
-                    enhanced_desc = desc.copy()
-                    enhanced_desc['flux_prompt'] = fallback_prompt
-                    enhanced_descriptions.append(enhanced_desc)
+                logger.warning("⚠️  LLM生成被禁用或初始化失败，使用备用翻译方法")
+                # 先生成备用prompts（同时作为ComfyUI prompts），再合并进描述
+                fallback_prompts = [
+                    self.translate_to_flux_prompt(desc.get('chinese_description', ''))
+                    for desc in visual_descriptions
+                ]
+                enhanced_descriptions = [
+                    dict(desc, flux_prompt=prompt) for desc, prompt in zip(visual_descriptions, fallback_prompts)
+                ]
+                comfyui_prompts = [prompt for prompt in fallback_prompts if prompt]
                 
-                # 保存备用prompts到基础文件
+                # 保存备用prompts到基础文件，同时生成ComfyUI专用的prompts文件
                 basic_prompts_path = images_folder / "basic_flux_prompts.json"
-                with open(basic_prompts_path, 'w', encoding='utf-8') as f:
-                    json.dump(enhanced_descriptions, f, ensure_ascii=False, indent=2)
-                print(f"已保存基础图像生成prompts: {basic_prompts_path}")
-                
-                # 生成ComfyUI专用的prompts文件
-                self.generate_comfyui_prompts(enhanced_descriptions, images_folder)
+                self._emit_prompts(enhanced_descriptions, images_folder, basic_prompts_path, comfyui_prompts)
+                logger.info(f"已保存基础图像生成prompts: {basic_prompts_path}")
+        
+        return enhanced_descriptions
+    
+    async def aprocess_single_shot(self, shot_name: str) -> None:
+        """
+        异步处理单个分集的故事板
+        
+        配音只依赖故事线，不依赖LLM生成的图像prompts，因此配音合成在线程中
+        先行启动，与prompt生成同时进行，生成字幕前再等待其完成。
         
-        # 更新visual_descriptions为最终版本
-        visual_descriptions = enhanced_descriptions
+        Args:
+            shot_name: 分集名称，如 'shot_01'
+        """
+        logger.info(f"正在处理故事板: {shot_name}")
+        
+        # 加载故事板数据
+        storyboard_data = self.load_storyboard(shot_name)
         
         # 处理故事线并保存到subtitles目录
         storylines = self.process_storylines(storyboard_data)
-        subtitles_folder = self.assets_dir / shot_name / "subtitles"
-        subtitles_folder.mkdir(parents=True, exist_ok=True)
+        subtitles_folder = self._shot_folder(shot_name, "subtitles", create=True)
         storyline_path = subtitles_folder / f"{shot_name}_storylines.json"
-        with open(storyline_path, 'w', encoding='utf-8') as f:
-            json.dump(storylines, f, ensure_ascii=False, indent=2)
-        print(f"已保存故事线到: {storyline_path}")
+        _write_json_array(storyline_path, storylines)
+        logger.info(f"已保存故事线到: {storyline_path}")
         
-        # 步骤1：检查并生成音频文件
+        # 步骤1：检查并生成音频文件（与下面的prompt生成同时进行）
+        audio_task = None
         if self.generate_audio:
-            self._ensure_audio_files_exist(storylines, shot_name)
+            audio_task = asyncio.ensure_future(
+                asyncio.to_thread(self._ensure_audio_files_exist, storylines, shot_name)
+            )
         
-        # 步骤2：生成字幕RST文件（此时音频文件应该已完整）
+        # 步骤2：生成或加载图像prompts（配音在后台线程中同时合成）
+        await self._enhance_and_save(shot_name, storyboard_data)
+        
+        # 等待配音合成完成
+        if audio_task is not None:
+            await audio_task
+        
+        # 步骤3：生成字幕RST文件（此时音频文件应该已完整）
         subtitle_segments = self.generate_complete_rst_file(storylines, shot_name)
-        print(f"✅ 字幕文件生成完成: {len(subtitle_segments)} 个片段")
+        logger.info(f"✅ 字幕文件生成完成: {len(subtitle_segments)} 个片段")
         
-        print(f"{shot_name} 处理完成!")
-        print(f"图像prompts已保存到: {images_folder}")
-        print(f"字幕文件已保存到: {subtitles_folder}")
-        print(f"音频文件目录: {self.assets_dir / shot_name / 'audios'}")
+        logger.info(f"{shot_name} 处理完成!")
+        logger.info(f"图像prompts已保存到: {self._shot_folder(shot_name, 'images')}")
+        logger.info(f"字幕文件已保存到: {subtitles_folder}")
+        logger.info(f"音频文件目录: {self._shot_folder(shot_name, 'audios')}")
+
+
+def setup_logging(level: int = logging.INFO) -> QueueListener:
+    """
+    配置日志输出：记录先放入队列，由后台线程格式化并写到标准输出，
+    处理线程和事件循环不会阻塞在终端I/O上
+    
+    Args:
+        level: 日志级别
+        
+    Returns:
+        QueueListener: 已启动的监听器，退出前需调用stop()把剩余日志写完
+    """
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = QueueListener(log_queue, stream_handler)
+    
+    logger.handlers[:] = [QueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+
+def _process_one(shot_name: str, options: Dict[str, Any], log_level: int = logging.INFO) -> None:
+    """
+    在子进程中处理单个分集（每个进程创建自己的处理器、事件循环和日志线程）
+    
+    Args:
+        shot_name: 分集名称，如 'shot_01'
+        options: 传给 StoryboardProcessor 的参数
+        log_level: 日志级别
+    """
+    log_listener = setup_logging(log_level)
+    try:
+        processor = StoryboardProcessor(shot_name=shot_name, **options)
+        asyncio.run(processor.process(shot_name))
+    finally:
+        log_listener.stop()
+
+
+def process_shots_in_processes(shot_names: List[str], options: Dict[str, Any], max_workers: int = None,
+                               log_level: int = logging.INFO) -> None:
+    """
+    用进程池并行处理多个分集，每个分集在独立的进程中运行
+    
+    Args:
+        shot_names: 分集名称列表
+        options: 传给 StoryboardProcessor 的参数
+        max_workers: 进程数，默认为CPU核心数
+        log_level: 子进程的日志级别
+    """
+    max_workers = min(max_workers or os.cpu_count() or 1, len(shot_names))
+    logger.info(f"发现 {len(shot_names)} 个故事板文件，使用 {max_workers} 个进程并行处理...")
+    
+    errors = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        future_to_shot = {
+            executor.submit(partial(_process_one, options=options, log_level=log_level), name): name
+            for name in shot_names
+        }
+        for future in as_completed(future_to_shot):
+            name = future_to_shot[future]
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"❌ {name} 处理失败: {e}")
+                errors.append((name, e))
+    
+    logger.info("-" * 50)
+    logger.info(f"批量处理完成: 成功 {len(shot_names) - len(errors)} 个, 失败 {len(errors)} 个")
+    if errors:
+        raise errors[0][1]
 
 
 def main():
@@ -958,6 +1841,15 @@ def main():
                        help='跳过配音文件生成（默认会自动生成音频）')
     parser.add_argument('--no-enhance', action='store_true',
                        help='跳过LLM prompt增强（默认会使用LLM增强图像prompts）')
+    parser.add_argument('--audio-workers', type=int, default=8,
+                       help='每个分集并发合成配音的线程数（默认：8）')
+    parser.add_argument('--processes', type=int, default=1,
+                       help='批量处理时并行的进程数，0表示使用全部CPU核心（默认：1，在当前进程内并发处理；'
+                            '多进程时各分集分别请求LLM，不再合并请求）')
+    parser.add_argument('--force', action='store_true',
+                       help='忽略指纹和校验文件，重新生成ComfyUI prompts和字幕文件')
+    parser.add_argument('--quiet', action='store_true',
+                       help='只输出警告和错误，不输出处理进度')
     parser.add_argument('--assets-dir', default='assets', 
                        help='资源目录路径（默认：assets）')
     
@@ -968,18 +1860,33 @@ def main():
     # 默认增强prompt，除非指定 --no-enhance
     enhance_prompts = not args.no_enhance
     
+    options = dict(
+        generate_audio=generate_audio, 
+        storyboard_dir="storyboard",
+        assets_dir=args.assets_dir,
+        enhance_prompts=enhance_prompts,
+        audio_workers=args.audio_workers,
+        force=args.force
+    )
+    
+    # --quiet 时只输出警告和错误
+    log_level = logging.WARNING if args.quiet else logging.INFO
+    log_listener = setup_logging(log_level)
     try:
-        processor = StoryboardProcessor(
-            shot_name=args.shot, 
-            generate_audio=generate_audio, 
-            storyboard_dir="storyboard",
-            assets_dir=args.assets_dir,
-            enhance_prompts=enhance_prompts
-        )
-        processor.process(args.shot)
+        if args.shot is None and args.processes != 1:
+            # 多进程批量处理：主进程只列出分集，每个分集在独立进程中创建自己的处理器
+            storyboard_files = StoryboardProcessor.list_storyboard_files(options['storyboard_dir'])
+            shot_names = [f.stem.replace('_storyboard', '') for f in storyboard_files]
+            if shot_names:
+                process_shots_in_processes(shot_names, options, args.processes or None, log_level)
+        else:
+            processor = StoryboardProcessor(shot_name=args.shot, **options)
+            asyncio.run(processor.process(args.shot))
     except Exception as e:
-        print(f"错误: {e}")
+        logger.error(f"错误: {e}")
         sys.exit(1)
+    finally:
+        log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+"""SubtitleRenderer.get_subtitle_at_time 的边界时刻测试"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.subtitle_processor import SubtitleRenderer
+
+
+RST = """
+.. subtitle:: 场景01_片段01
+   :start_time: 0.00
+   :end_time: 1.40
+   :duration: 1.40
+   :text: 第一句
+
+.. subtitle:: 场景02_片段01
+   :start_time: 1.40
+   :end_time: 3.00
+   :duration: 1.60
+   :text: 第二句
+"""
+
+
+def make_renderer(tmp_path):
+    rst_path = tmp_path / "test.rst"
+    rst_path.write_text(RST, encoding="utf-8")
+    return SubtitleRenderer(str(rst_path))
+
+
+def test_boundary_returns_first_segment_cold(tmp_path):
+    renderer = make_renderer(tmp_path)
+    # 21/15 == 1.40：恰好落在两个片段的首尾时间上
+    assert renderer.get_subtitle_at_time(21 / 15) == "第一句"
+
+
+def test_boundary_returns_first_segment_warm(tmp_path):
+    renderer = make_renderer(tmp_path)
+    # 先查询后一个片段内的时间，再查询边界时刻，结果不受之前查询的影响
+    assert renderer.get_subtitle_at_time(2.0) == "第二句"
+    assert renderer.get_subtitle_at_time(21 / 15) == "第一句"
+    assert renderer.get_subtitle_at_time(0.5) == "第一句"
+    assert renderer.get_subtitle_at_time(21 / 15) == "第一句"
+
+
+def test_outside_segments(tmp_path):
+    renderer = make_renderer(tmp_path)
+    assert renderer.get_subtitle_at_time(3.0) == "第二句"
+    assert renderer.get_subtitle_at_time(3.01) == ""
+    assert renderer.get_subtitle_at_time(-0.1) == ""
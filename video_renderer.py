@@ -7,28 +7,112 @@
 
 import cv2
 import numpy as np
+import PIL
 from PIL import Image, ImageDraw, ImageFont
 import json
 import os
-from moviepy import VideoFileClip, AudioFileClip, CompositeAudioClip, concatenate_audioclips
+import subprocess
+import wave
+from moviepy import AudioClip, AudioFileClip, CompositeAudioClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
 import warnings
 from src.subtitle_processor import SubtitleProcessor, SubtitleRenderer
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import threading
+import queue
+from collections import deque
 from functools import lru_cache
 import time
-import random
 import math
+import multiprocessing
+from multiprocessing import shared_memory
 from typing import Dict, List, Tuple, Optional
 
+# Numba JIT加速（可选）
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    print("警告: numba 未安装，字幕合成将使用NumPy实现")
 
-# 全局缓存，避免重复加载相同资源
-image_cache: Dict[str, np.ndarray] = {}
-image_cache_lock = threading.Lock()
+# Pillow-SIMD（可选，版本号带.post后缀）加速文字光栅化
+PILLOW_SIMD = '.post' in PIL.__version__
+
+# CUDA加速（可选，需要带CUDA支持编译的OpenCV）
+try:
+    CUDA_AVAILABLE = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    CUDA_AVAILABLE = False
+
+# 是否使用GPU渲染Ken Burns特效（由create_complete_video根据配置设置）
+USE_GPU = False
+gpu_local = threading.local()
+
+# 已上传到显存的场景图像（按主机内存地址和形状区分，所有渲染线程共用）
+_gpu_sources: Dict[Tuple[int, Tuple[int, ...]], "cv2.cuda_GpuMat"] = {}
+_gpu_sources_lock = threading.Lock()
+
+
+# 配置和字幕缓存（由load_config / load_captions填充）
+_CONFIG: Optional[Dict] = None
+_CAPTIONS: Dict[str, List[str]] = {}
+
+# 背景音乐缓存（按(路径, 音量)缓存，同一进程内的多个分集只解码一次）
+_BG_CACHE: Dict[Tuple[str, float], AudioFileClip] = {}
+
+
+class FramePool:
+    """
+    输出帧缓冲池（线程安全）
+    
+    渲染线程取缓冲直接作为特效的输出，写帧线程把帧写入编码器后归还，
+    缓冲循环使用而不是每帧重新分配。池中没有空闲缓冲时新建一个，
+    因此缓冲数量等于同时在途的最大帧数，不会因为等待缓冲而阻塞。
+    page_locked为True时（GPU模式）新建的缓冲注册为锁页内存，显存到缓冲的
+    下载可以直接DMA，用完后需调用close()注销。缓冲形状由pix_fmt决定（见frame_shape）。
+    """
+    
+    def __init__(self, width: int, height: int, page_locked: bool = False, pix_fmt: str = 'bgr24'):
+        self.shape = frame_shape(width, height, pix_fmt)
+        self.page_locked = page_locked
+        self._free = queue.LifoQueue()
+        self._locked: List[np.ndarray] = []
+    
+    def acquire(self) -> np.ndarray:
+        """取一个空闲缓冲（内容未初始化）"""
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            frame = np.empty(self.shape, dtype=np.uint8)
+            if self.page_locked:
+                cv2.cuda.registerPageLocked(frame)
+                self._locked.append(frame)
+            return frame
+    
+    def release(self, frame: np.ndarray) -> None:
+        """归还缓冲"""
+        self._free.put(frame)
+    
+    def close(self) -> None:
+        """注销锁页内存（之后不能再使用池中的缓冲）"""
+        for frame in self._locked:
+            cv2.cuda.unregisterPageLocked(frame)
+        self._locked.clear()
+
+
+def frame_shape(width: int, height: int, pix_fmt: str = 'bgr24') -> Tuple[int, ...]:
+    """
+    一帧原始数据的数组形状
+    
+    bgr24为(高, 宽, 3)；yuv420p为I420平面格式(高 * 3 / 2, 宽)：
+    Y平面在上，四分之一大小的U、V平面依次排在下面。
+    """
+    if pix_fmt == 'yuv420p':
+        return (height * 3 // 2, width)
+    return (height, width, 3)
 
-# 字体缓存
-font_cache: Dict[Tuple[str, int], ImageFont.FreeTypeFont] = {}
-font_cache_lock = threading.Lock()
 
 # Ken Burns特效类型定义
 class KenBurnsEffect:
@@ -64,69 +148,96 @@ EFFECT_SEQUENCE = [
 ]
 
 
-@lru_cache(maxsize=32)
 def load_config():
-    """加载配置文件（带缓存）"""
-    with open('config.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """加载配置文件（每个进程只解析一次）"""
+    global _CONFIG
+    if _CONFIG is None:
+        with open('config.json', 'r', encoding='utf-8') as f:
+            _CONFIG = json.load(f)
+    return _CONFIG
 
 
-@lru_cache(maxsize=32)
 def load_captions(shot="shot_01"):
-    """加载字幕文件（带缓存）"""
-    caption_path = f'assets/{shot}/subtitles/{shot}_caption.json'
-    with open(caption_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """加载字幕文件（每个分集只解析一次）"""
+    if shot not in _CAPTIONS:
+        caption_path = f'assets/{shot}/subtitles/{shot}_caption.json'
+        with open(caption_path, 'r', encoding='utf-8') as f:
+            _CAPTIONS[shot] = json.load(f)
+    return _CAPTIONS[shot]
 
 
-def get_cached_font(font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
-    """获取缓存的字体"""
-    cache_key = (font_path, font_size)
+def preload_images(shot, scene_count: int, width: int, height: int) -> np.ndarray:
+    """
+    预加载所有场景图像，返回按场景编号索引的只读数组
     
-    with font_cache_lock:
-        if cache_key in font_cache:
-            return font_cache[cache_key]
-        
+    所有图像缩放后写入一块预先分配的 (scene_count + 1, 高, 宽, 3) 数组，
+    第n个场景的图像就是 scene_images[n]（下标0不使用），渲染时直接索引，
+    不需要按路径查缓存和加锁。读文件和解码分开：少量线程顺序读取文件内容，
+    读完一张就交给解码线程池解码并缩放，磁盘读取与解码重叠进行。
+    """
+    # 根据新的文件结构查找图像文件
+    image_paths = {scene_number: f"assets/{shot}/images/{shot}_{scene_number}.png"
+                   for scene_number in range(1, scene_count + 1)}
+    scene_images = np.zeros((scene_count + 1, height, width, 3), dtype=np.uint8)
+    
+    def read_image_bytes(image_path: str) -> Optional[bytes]:
         try:
-            font = ImageFont.truetype(font_path, font_size)
-            font_cache[cache_key] = font
-            return font
-        except:
-            font = ImageFont.load_default()
-            font_cache[cache_key] = font
-            return font
-
-
-def preload_images(shot, scene_count: int, width: int, height: int) -> None:
-    """预加载所有图像到缓存"""
-    def load_single_image(scene_number: int):
-        # 根据新的文件结构查找图像文件
-        image_path = f"assets/{shot}/images/{shot}_{scene_number}.png"
-        
-        with image_cache_lock:
-            if image_path in image_cache:
-                return
-        
-        img = cv2.imread(image_path)
+            with open(image_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def decode_image(scene_number: int, data: Optional[bytes]) -> None:
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if data else None
         if img is None:
-            img = np.zeros((height, width, 3), dtype=np.uint8)
-            print(f"警告：无法加载图像 {image_path}")
+            print(f"警告：无法加载图像 {image_paths[scene_number]}")
         else:
-            img = cv2.resize(img, (width, height))
-        
-        with image_cache_lock:
-            image_cache[image_path] = img
-    
-    # 使用线程池并发加载图像
-    with ThreadPoolExecutor(max_workers=min(16, scene_count)) as executor:
-        futures = [executor.submit(load_single_image, i) for i in range(1, scene_count + 1)]
-        for future in as_completed(futures):
+            cv2.resize(img, (width, height), dst=scene_images[scene_number])
+    
+    # 读取线程池（2个线程）和解码线程池并行工作
+    cpu_count = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=2) as io_executor, \
+            ThreadPoolExecutor(max_workers=max(1, min(16, cpu_count, scene_count))) as decode_executor:
+        read_futures = {scene_number: io_executor.submit(read_image_bytes, path)
+                        for scene_number, path in image_paths.items()}
+        decode_futures = [decode_executor.submit(decode_image, scene_number, future.result())
+                          for scene_number, future in read_futures.items()]
+        for future in decode_futures:
             try:
                 future.result()
-            except Exception as e:
-                pass  # 忽略单个图像加载错误
+            except Exception:
+                pass  # 忽略单个图像加载错误（该场景为黑色画面）
     
-    print(f"图像缓存完成: {len(image_cache)}张")
+    # 图像只读，各线程直接共享同一个数组
+    scene_images.setflags(write=False)
+    print(f"图像缓存完成: {scene_count}张")
+    return scene_images
+
+
+# 特效类型 → 整数编号（供JIT编译的参数计算使用，未知类型按缩放放大处理）
+EFFECT_IDS = {
+    effect: effect_id for effect_id, effect in enumerate([
+        KenBurnsEffect.ZOOM_IN,
+        KenBurnsEffect.ZOOM_OUT,
+        KenBurnsEffect.PAN_LEFT,
+        KenBurnsEffect.PAN_RIGHT,
+        KenBurnsEffect.PAN_UP,
+        KenBurnsEffect.PAN_DOWN,
+        KenBurnsEffect.ZOOM_PAN_LEFT,
+        KenBurnsEffect.ZOOM_PAN_RIGHT,
+        KenBurnsEffect.ZOOM_PAN_UP,
+        KenBurnsEffect.ZOOM_PAN_DOWN,
+        KenBurnsEffect.ROTATE_ZOOM,
+    ])
+}
+ROTATE_ZOOM_ID = EFFECT_IDS[KenBurnsEffect.ROTATE_ZOOM]
+# 缩放倍数固定、只有裁剪位置变化的平移特效
+PAN_EFFECT_IDS = {
+    EFFECT_IDS[KenBurnsEffect.PAN_LEFT],
+    EFFECT_IDS[KenBurnsEffect.PAN_RIGHT],
+    EFFECT_IDS[KenBurnsEffect.PAN_UP],
+    EFFECT_IDS[KenBurnsEffect.PAN_DOWN],
+}
 
 
 def apply_ken_burns_effect(img: np.ndarray, progress: float, effect_type: str, 
@@ -150,31 +261,30 @@ def apply_ken_burns_effect(img: np.ndarray, progress: float, effect_type: str,
     # 缓动函数（使运动更自然），不加速，与场景持续时间自然匹配
     eased_progress = easing_function(progress)
     
-    if effect_type == KenBurnsEffect.ZOOM_IN:
-        return apply_zoom_in(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.ZOOM_OUT:
-        return apply_zoom_out(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.PAN_LEFT:
-        return apply_pan_left(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.PAN_RIGHT:
-        return apply_pan_right(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.PAN_UP:
-        return apply_pan_up(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.PAN_DOWN:
-        return apply_pan_down(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.ZOOM_PAN_LEFT:
-        return apply_zoom_pan_left(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.ZOOM_PAN_RIGHT:
-        return apply_zoom_pan_right(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.ZOOM_PAN_UP:
-        return apply_zoom_pan_up(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.ZOOM_PAN_DOWN:
-        return apply_zoom_pan_down(img, eased_progress, width, height)
-    elif effect_type == KenBurnsEffect.ROTATE_ZOOM:
-        return apply_rotate_zoom(img, eased_progress, width, height)
-    else:
-        # 默认缩放效果
-        return apply_zoom_in(img, eased_progress, width, height)
+    return render_ken_burns(img, EFFECT_IDS.get(effect_type, 0), eased_progress, width, height)
+
+
+def render_ken_burns(img: np.ndarray, effect_id: int, progress: float,
+                     width: int, height: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """按特效编号和（已缓动的）进度渲染一帧（out为输出缓冲，None时新建）"""
+    zoom, start_x, start_y, angle = ken_burns_params(progress, effect_id, width, height)
+    if effect_id == ROTATE_ZOOM_ID:
+        return rotate_zoom(img, zoom, angle, width, height, out)
+    return zoom_crop(img, zoom, start_x, start_y, width, height, out)
+
+
+def ken_burns_frame_key(img: np.ndarray, effect_id: int, progress: float, width: int, height: int) -> tuple:
+    """
+    特效帧的内容标识：标识相同的两帧像素完全相同
+    
+    CPU缩放裁剪只取决于原图上的整数视图，缓动曲线两端和慢速场景中相邻帧
+    经常落在同一视图上；旋转和GPU路径按浮点参数区分。
+    """
+    zoom, start_x, start_y, angle = ken_burns_params(progress, effect_id, width, height)
+    if USE_GPU or effect_id == ROTATE_ZOOM_ID:
+        return zoom, start_x, start_y, angle
+    src_height, src_width = img.shape[:2]
+    return zoom_crop_window(zoom, start_x, start_y, src_width, src_height, width, height)
 
 
 def easing_function(t: float) -> float:
@@ -186,355 +296,679 @@ def easing_function(t: float) -> float:
         return 1 - pow(-2 * t + 2, 2) / 2
 
 
-def apply_zoom_in(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
-    """缩放放大效果（1倍速度）"""
-    zoom_start = 1.0
-    zoom_end = 1.15  # 减少缩放幅度
-    current_zoom = zoom_start + (zoom_end - zoom_start) * progress
+def ken_burns_params(progress: float, effect_id: int, width: int, height: int) -> Tuple[float, float, float, float]:
+    """
+    计算特效在当前进度下的几何参数
     
-    zoom_height = int(height * current_zoom)
-    zoom_width = int(width * current_zoom)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
+    Args:
+        progress: 已缓动的进度 (0.0 到 1.0)
+        effect_id: 特效编号（见EFFECT_IDS）
+        width: 目标宽度
+        height: 目标高度
     
-    # 从中心裁剪
-    start_y = (zoom_height - height) // 2
+    Returns:
+        (缩放倍数, 放大坐标系中的裁剪起点x, 裁剪起点y, 旋转角度)
+    """
+    if effect_id == 1:
+        # 缩放缩小：从zoom_in的结束值回到原图
+        zoom = 1.15 + (1.0 - 1.15) * progress
+    elif 2 <= effect_id <= 5:
+        # 平移：固定放大1.1倍，平移距离为宽/高的20%
+        zoom = 1.1
+    else:
+        # 缩放放大及组合效果：1.0 → 1.15
+        zoom = 1.0 + (1.15 - 1.0) * progress
+    
+    zoom_width = int(width * zoom)
+    zoom_height = int(height * zoom)
+    
+    # 默认从中心裁剪
     start_x = (zoom_width - width) // 2
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    start_y = (zoom_height - height) // 2
+    
+    if effect_id == 2:
+        # 向左平移（从右侧开始）
+        start_x = int((zoom_width - width) - progress * int(width * 0.2))
+    elif effect_id == 3:
+        start_x = int(progress * int(width * 0.2))
+    elif effect_id == 4:
+        start_y = int((zoom_height - height) - progress * int(height * 0.2))
+    elif effect_id == 5:
+        start_y = int(progress * int(height * 0.2))
+    elif effect_id == 6:
+        start_x = int((zoom_width - width) / 2 - progress * int(width * 0.15))
+    elif effect_id == 7:
+        start_x = int((zoom_width - width) / 2 + progress * int(width * 0.15))
+    elif effect_id == 8:
+        start_y = int((zoom_height - height) / 2 - progress * int(height * 0.15))
+    elif effect_id == 9:
+        start_y = int((zoom_height - height) / 2 + progress * int(height * 0.15))
+    
+    start_x = max(0, min(start_x, zoom_width - width))
+    start_y = max(0, min(start_y, zoom_height - height))
+    
+    # 旋转角度（±2度，减少旋转幅度），只有rotate_zoom使用
+    angle = 0.0
+    if effect_id == 10:
+        angle = math.sin(progress * math.pi) * 2
+    
+    return zoom, float(start_x), float(start_y), angle
 
 
-def apply_zoom_out(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
-    """缩放缩小效果（1倍速度）"""
-    zoom_start = 1.15  # 对应zoom_in的结束值
-    zoom_end = 1.0
-    current_zoom = zoom_start + (zoom_end - zoom_start) * progress
-    
-    zoom_height = int(height * current_zoom)
-    zoom_width = int(width * current_zoom)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
+if NUMBA_AVAILABLE:
+    # 每帧调用的标量计算编译为机器码（显式签名：导入时编译，带磁盘缓存）
+    easing_function = njit('float64(float64)', cache=True)(easing_function)
+    ken_burns_params = njit('UniTuple(float64, 4)(float64, int64, int64, int64)', cache=True)(ken_burns_params)
+
+
+def gpu_warp(img: np.ndarray, M: np.ndarray, width: int, height: int,
+             border_mode: int = cv2.BORDER_REPLICATE, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    在GPU上执行仿射变换
     
-    start_y = (zoom_height - height) // 2
-    start_x = (zoom_width - width) // 2
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    每张原图只上传一次，由所有线程共用；每个线程有自己的CUDA流和输出显存，
+    各线程的变换和下载互不阻塞，也不会每帧重新分配显存。
+    """
+    src = gpu_source(img)
+    
+    stream = getattr(gpu_local, 'stream', None)
+    if stream is None:
+        stream = gpu_local.stream = cv2.cuda.Stream()
+    dst = getattr(gpu_local, 'dst', None)
+    if dst is None or dst.size() != (width, height):
+        dst = gpu_local.dst = cv2.cuda_GpuMat(height, width, cv2.CV_8UC3)
+    
+    cv2.cuda.warpAffine(src, M, (width, height), dst=dst,
+                        flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                        borderMode=border_mode, stream=stream)
+    out = dst.download(stream, out) if out is not None else dst.download(stream)
+    stream.waitForCompletion()
+    return out
 
 
-def apply_pan_left(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
-    """向左平移效果（1倍速度）"""
-    pan_distance = int(width * 0.2)  # 减少平移距离
-    zoom_factor = 1.1  # 减少放大倍数
+def gpu_source(img: np.ndarray) -> "cv2.cuda_GpuMat":
+    """获取原图在显存中的副本（第一次使用时上传）"""
+    key = (img.__array_interface__['data'][0], img.shape)
+    with _gpu_sources_lock:
+        src = _gpu_sources.get(key)
+        if src is None:
+            src = _gpu_sources[key] = cv2.cuda_GpuMat()
+            src.upload(img)
+    return src
+
+
+def zoom_crop(img: np.ndarray, zoom: float, start_x: float, start_y: float,
+              width: int, height: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    从放大后的坐标系中裁剪目标区域（不生成放大后的整图）
     
-    zoom_width = int(width * zoom_factor)
-    zoom_height = int(height * zoom_factor)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
+    放大zoom倍后在(start_x, start_y)处裁剪width x height，等价于在原图上
+    取一个(width/zoom) x (height/zoom)的视图（切片，无像素拷贝），
+    再只把这个视图缩放到目标尺寸。
     
-    # 计算起始位置（从右侧开始）
-    start_x = int((zoom_width - width) - progress * pan_distance)
-    start_y = (zoom_height - height) // 2
+    Args:
+        img: 输入图像
+        zoom: 缩放倍数
+        start_x: 放大坐标系中的裁剪起点x
+        start_y: 放大坐标系中的裁剪起点y
+        width: 目标宽度
+        height: 目标高度
+        out: 输出缓冲（None时新建）
     
-    start_x = max(0, min(start_x, zoom_width - width))
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    Returns:
+        处理后的图像
+    """
+    if USE_GPU:
+        return gpu_warp(img, zoom_crop_matrix(zoom, start_x, start_y), width, height, out=out)
+    
+    src_height, src_width = img.shape[:2]
+    x0, y0, crop_width, crop_height = zoom_crop_window(zoom, start_x, start_y, src_width, src_height, width, height)
+    view = img[y0:y0+crop_height, x0:x0+crop_width]
+    return cv2.resize(view, (width, height), dst=out)
+
+
+def zoom_crop_window(zoom: float, start_x: float, start_y: float, src_width: int, src_height: int,
+                     width: int, height: int) -> Tuple[int, int, int, int]:
+    """zoom_crop在原图上取的视图 (x0, y0, 宽, 高)，CPU路径的输出只由它决定"""
+    crop_width = min(src_width, max(1, int(round(width / zoom))))
+    crop_height = min(src_height, max(1, int(round(height / zoom))))
+    
+    x0 = max(0, min(int(round(start_x / zoom)), src_width - crop_width))
+    y0 = max(0, min(int(round(start_y / zoom)), src_height - crop_height))
+    return x0, y0, crop_width, crop_height
+
+
+def zoom_crop_matrix(zoom: float, start_x: float, start_y: float) -> np.ndarray:
+    """
+    zoom_crop对应的仿射矩阵（输出坐标→原图坐标，按像素中心对齐）
+    
+    输出像素(u, v)对应原图((u + start_x) / zoom, (v + start_y) / zoom)，
+    配合cv2.WARP_INVERSE_MAP使用，供warpAffine类实现（如GPU路径）直接调用。
+    """
+    s = 1.0 / zoom
+    return np.array([[s, 0.0, (start_x + 0.5) * s - 0.5],
+                     [0.0, s, (start_y + 0.5) * s - 0.5]], dtype=np.float32)
+
+
+def apply_zoom_in(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
+    """缩放放大效果（1倍速度）"""
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.ZOOM_IN], progress, width, height)
+
+
+def apply_zoom_out(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
+    """缩放缩小效果（1倍速度）"""
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.ZOOM_OUT], progress, width, height)
+
+
+def apply_pan_left(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
+    """向左平移效果（1倍速度）"""
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.PAN_LEFT], progress, width, height)
 
 
 def apply_pan_right(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
     """向右平移效果（1倍速度）"""
-    pan_distance = int(width * 0.2)  # 减少平移距离
-    zoom_factor = 1.1  # 减少放大倍数
-    
-    zoom_width = int(width * zoom_factor)
-    zoom_height = int(height * zoom_factor)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
-    
-    start_x = int(progress * pan_distance)
-    start_y = (zoom_height - height) // 2
-    
-    start_x = max(0, min(start_x, zoom_width - width))
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.PAN_RIGHT], progress, width, height)
 
 
 def apply_pan_up(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
     """向上平移效果（1倍速度）"""
-    pan_distance = int(height * 0.2)  # 减少平移距离
-    zoom_factor = 1.1  # 减少放大倍数
-    
-    zoom_width = int(width * zoom_factor)
-    zoom_height = int(height * zoom_factor)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
-    
-    start_x = (zoom_width - width) // 2
-    start_y = int((zoom_height - height) - progress * pan_distance)
-    
-    start_y = max(0, min(start_y, zoom_height - height))
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.PAN_UP], progress, width, height)
 
 
 def apply_pan_down(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
     """向下平移效果（1倍速度）"""
-    pan_distance = int(height * 0.2)  # 减少平移距离
-    zoom_factor = 1.1  # 减少放大倍数
-    
-    zoom_width = int(width * zoom_factor)
-    zoom_height = int(height * zoom_factor)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
-    
-    start_x = (zoom_width - width) // 2
-    start_y = int(progress * pan_distance)
-    
-    start_y = max(0, min(start_y, zoom_height - height))
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.PAN_DOWN], progress, width, height)
 
 
 def apply_zoom_pan_left(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
     """缩放+左移组合效果（1倍速度）"""
-    zoom_start = 1.0
-    zoom_end = 1.15  # 减少缩放幅度
-    current_zoom = zoom_start + (zoom_end - zoom_start) * progress
-    
-    pan_distance = int(width * 0.15)  # 减少平移距离
-    
-    zoom_width = int(width * current_zoom)
-    zoom_height = int(height * current_zoom)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
-    
-    start_x = int((zoom_width - width) / 2 - progress * pan_distance)
-    start_y = (zoom_height - height) // 2
-    
-    start_x = max(0, min(start_x, zoom_width - width))
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.ZOOM_PAN_LEFT], progress, width, height)
 
 
 def apply_zoom_pan_right(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
     """缩放+右移组合效果（1倍速度）"""
-    zoom_start = 1.0
-    zoom_end = 1.15  # 减少缩放幅度
-    current_zoom = zoom_start + (zoom_end - zoom_start) * progress
-    
-    pan_distance = int(width * 0.15)  # 减少平移距离
-    
-    zoom_width = int(width * current_zoom)
-    zoom_height = int(height * current_zoom)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
-    
-    start_x = int((zoom_width - width) / 2 + progress * pan_distance)
-    start_y = (zoom_height - height) // 2
-    
-    start_x = max(0, min(start_x, zoom_width - width))
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.ZOOM_PAN_RIGHT], progress, width, height)
 
 
 def apply_zoom_pan_up(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
     """缩放+上移组合效果（1倍速度）"""
-    zoom_start = 1.0
-    zoom_end = 1.15  # 减少缩放幅度
-    current_zoom = zoom_start + (zoom_end - zoom_start) * progress
-    
-    pan_distance = int(height * 0.15)  # 减少平移距离
-    
-    zoom_width = int(width * current_zoom)
-    zoom_height = int(height * current_zoom)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
-    
-    start_x = (zoom_width - width) // 2
-    start_y = int((zoom_height - height) / 2 - progress * pan_distance)
-    
-    start_y = max(0, min(start_y, zoom_height - height))
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.ZOOM_PAN_UP], progress, width, height)
 
 
 def apply_zoom_pan_down(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
     """缩放+下移组合效果（1倍速度）"""
-    zoom_start = 1.0
-    zoom_end = 1.15  # 减少缩放幅度
-    current_zoom = zoom_start + (zoom_end - zoom_start) * progress
-    
-    pan_distance = int(height * 0.15)  # 减少平移距离
+    return render_ken_burns(img, EFFECT_IDS[KenBurnsEffect.ZOOM_PAN_DOWN], progress, width, height)
+
+
+def rotate_zoom_matrix(zoom: float, angle: float, src_width: int, src_height: int,
+                       width: int, height: int) -> np.ndarray:
+    """
+    旋转+缩放对应的仿射矩阵（输出坐标→原图坐标，按像素中心对齐）
     
-    zoom_width = int(width * current_zoom)
-    zoom_height = int(height * current_zoom)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
+    等价于把原图缩放zoom倍后放在正方形画布中心，绕画布中心旋转angle度，
+    再从中心裁剪width x height：三步的坐标变换合并为一个矩阵，
+    配合cv2.WARP_INVERSE_MAP使用，不生成缩放后的图像和画布。
+    """
+    zoom_width = int(width * zoom)
+    zoom_height = int(height * zoom)
+    canvas_size = int(max(width, height) * zoom * 1.5)
+    center = canvas_size // 2
+    
+    # 输出像素 → 旋转后画布坐标（裁剪偏移）
+    crop = np.array([[1.0, 0.0, (canvas_size - width) // 2],
+                     [0.0, 1.0, (canvas_size - height) // 2],
+                     [0.0, 0.0, 1.0]])
+    # 旋转后画布坐标 → 旋转前画布坐标（旋转的逆变换）
+    unrotate = np.vstack([cv2.invertAffineTransform(cv2.getRotationMatrix2D((center, center), angle, 1.0)),
+                          [0.0, 0.0, 1.0]])
+    # 画布坐标 → 缩放图坐标 → 原图坐标（与cv2.resize的像素中心对齐方式一致）
+    sx = src_width / zoom_width
+    sy = src_height / zoom_height
+    unzoom = np.array([[sx, 0.0, (0.5 - (canvas_size - zoom_width) // 2) * sx - 0.5],
+                       [0.0, sy, (0.5 - (canvas_size - zoom_height) // 2) * sy - 0.5],
+                       [0.0, 0.0, 1.0]])
+    return (unzoom @ unrotate @ crop)[:2].astype(np.float32)
+
+
+def rotate_zoom(img: np.ndarray, zoom: float, angle: float, width: int, height: int,
+                out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    缩放、旋转和裁剪合并为一次仿射变换，直接采样到目标尺寸（画布外区域为黑色）
     
-    start_x = (zoom_width - width) // 2
-    start_y = int((zoom_height - height) / 2 + progress * pan_distance)
+    Args:
+        img: 输入图像
+        zoom: 缩放倍数
+        angle: 旋转角度
+        width: 目标宽度
+        height: 目标高度
+        out: 输出缓冲（None时新建）
     
-    start_y = max(0, min(start_y, zoom_height - height))
-    return zoomed_img[start_y:start_y+height, start_x:start_x+width]
+    Returns:
+        处理后的图像
+    """
+    src_height, src_width = img.shape[:2]
+    M = rotate_zoom_matrix(zoom, angle, src_width, src_height, width, height)
+    if USE_GPU:
+        return gpu_warp(img, M, width, height, border_mode=cv2.BORDER_CONSTANT, out=out)
+    return cv2.warpAffine(img, M, (width, height), dst=out,
+                          flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                          borderMode=cv2.BORDER_CONSTANT)
 
 
 def apply_rotate_zoom(img: np.ndarray, progress: float, width: int, height: int) -> np.ndarray:
     """旋转+缩放效果（1倍速度）"""
-    zoom_start = 1.0
-    zoom_end = 1.15  # 减少缩放幅度
-    current_zoom = zoom_start + (zoom_end - zoom_start) * progress
+    return render_ken_burns(img, ROTATE_ZOOM_ID, progress, width, height)
+
+
+def hex_to_bgr(color: str) -> Tuple[int, int, int]:
+    """把#RRGGBB颜色转换为(B, G, R)元组"""
+    color = color.lstrip('#')
+    r, g, b = (int(color[i:i+2], 16) for i in (0, 2, 4))
+    return b, g, r
+
+
+@lru_cache(maxsize=64)
+def render_subtitle_sprite(text: str, font: ImageFont.FreeTypeFont,
+                           stroke_width: int, font_color: str = '#FFFFFF',
+                           stroke_color: str = '#000000') -> Tuple[np.ndarray, int, int]:
+    """
+    渲染带描边的字幕贴图（按文本缓存，同一句字幕只光栅化一次）
+    
+    文字只光栅化一次，描边由遮罩膨胀得到；颜色直接按BGR顺序组装，
+    不需要再做通道转换。
     
-    # 旋转角度（±2度，减少旋转幅度）
-    rotation_angle = math.sin(progress * math.pi) * 2
+    Args:
+        text: 字幕文本
+        font: 字体（由SubtitleRenderer加载）
+        stroke_width: 描边宽度
+        font_color: 文字颜色（#RRGGBB）
+        stroke_color: 描边颜色（#RRGGBB）
     
-    # 创建更大的画布进行旋转
-    canvas_size = int(max(width, height) * current_zoom * 1.5)
-    canvas = np.zeros((canvas_size, canvas_size, 3), dtype=np.uint8)
+    Returns:
+        (BGRA贴图, 贴图相对绘制原点的x偏移, y偏移)
+    """
+    left, top, right, bottom = font.getbbox(text)
     
-    # 缩放图像
-    zoom_width = int(width * current_zoom)
-    zoom_height = int(height * current_zoom)
-    zoomed_img = cv2.resize(img, (zoom_width, zoom_height))
+    sprite_width = max(1, right - left) + 2 * stroke_width
+    sprite_height = max(1, bottom - top) + 2 * stroke_width
     
-    # 将图像放置在画布中心
-    start_y = (canvas_size - zoom_height) // 2
-    start_x = (canvas_size - zoom_width) // 2
-    canvas[start_y:start_y+zoom_height, start_x:start_x+zoom_width] = zoomed_img
+    # 只光栅化一次文字得到灰度遮罩
+    mask_img = Image.new('L', (sprite_width, sprite_height), 0)
+    ImageDraw.Draw(mask_img).text((stroke_width - left, stroke_width - top), text, font=font, fill=255)
+    mask = np.asarray(mask_img)
     
-    # 应用旋转
-    center = (canvas_size // 2, canvas_size // 2)
-    rotation_matrix = cv2.getRotationMatrix2D(center, rotation_angle, 1.0)
-    rotated = cv2.warpAffine(canvas, rotation_matrix, (canvas_size, canvas_size))
+    # 对遮罩做形态学膨胀得到描边区域：矩形核与逐偏移重复绘制描边的覆盖范围一致，
+    # 且OpenCV对矩形核按行、列分离计算
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * stroke_width + 1, 2 * stroke_width + 1))
+    stroke = cv2.dilate(mask, kernel)
     
-    # 从中心裁剪目标尺寸
-    final_start_y = (canvas_size - height) // 2
-    final_start_x = (canvas_size - width) // 2
-    return rotated[final_start_y:final_start_y+height, final_start_x:final_start_x+width]
+    # 文字颜色按遮罩覆盖在描边颜色之上，alpha取膨胀后的遮罩
+    text_bgr = np.array(hex_to_bgr(font_color), dtype=np.uint16)
+    stroke_bgr = np.array(hex_to_bgr(stroke_color), dtype=np.uint16)
+    coverage = mask[..., None].astype(np.uint16)
+    bgr = (text_bgr * coverage + stroke_bgr * (255 - coverage) + 127) // 255
+    
+    sprite = np.dstack([bgr.astype(np.uint8), stroke])
+    return sprite, left - stroke_width, top - stroke_width
 
 
-def get_cached_image(shot: str, scene_number: int, width: int, height: int) -> np.ndarray:
-    """获取缓存的图像"""
-    # 根据新的文件结构查找图像文件
-    image_path = f"assets/{shot}/images/{shot}_{scene_number}.png"
+if NUMBA_AVAILABLE:
+    # 显式签名：导入时即编译（带磁盘缓存），固定为C连续的uint8数组
+    @njit('void(uint8[:, :, ::1], uint8[:, :, ::1], int64, int64)', nogil=True, cache=True)
+    def blit_sprite_kernel(frame, sprite, x, y):
+        """按alpha把BGRA贴图合成到BGR帧上（原地修改，整数运算）"""
+        sprite_h, sprite_w = sprite.shape[0], sprite.shape[1]
+        frame_h, frame_w = frame.shape[0], frame.shape[1]
+        for i in range(sprite_h):
+            fy = y + i
+            if fy < 0 or fy >= frame_h:
+                continue
+            for j in range(sprite_w):
+                fx = x + j
+                if fx < 0 or fx >= frame_w:
+                    continue
+                a = np.int32(sprite[i, j, 3])
+                if a == 0:
+                    continue
+                for c in range(3):
+                    v = np.int32(sprite[i, j, c]) * a + np.int32(frame[fy, fx, c]) * (255 - a)
+                    frame[fy, fx, c] = (v + 127) // 255
+
+
+def blit_sprite(frame: np.ndarray, sprite: np.ndarray, x: int, y: int) -> np.ndarray:
+    """把BGRA字幕贴图合成到BGR帧的(x, y)处"""
+    frame = np.ascontiguousarray(frame)
+    if NUMBA_AVAILABLE:
+        blit_sprite_kernel(frame, np.ascontiguousarray(sprite), x, y)
+        return frame
     
-    with image_cache_lock:
-        if image_path in image_cache:
-            return image_cache[image_path].copy()  # 返回副本避免多线程冲突
+    frame_h, frame_w = frame.shape[:2]
+    sprite_h, sprite_w = sprite.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(frame_w, x + sprite_w), min(frame_h, y + sprite_h)
+    if x0 >= x1 or y0 >= y1:
+        return frame
     
-    # 如果缓存中没有，现场加载
-    img = cv2.imread(image_path)
-    if img is None:
-        img = np.zeros((height, width, 3), dtype=np.uint8)
-        print(f"警告：无法加载图像 {image_path}")
-    else:
-        img = cv2.resize(img, (width, height))
+    roi = frame[y0:y1, x0:x1]
+    sprite_roi = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+    # uint16定点混合（255*255+127不会溢出），与Numba内核的取整方式一致
+    alpha = sprite_roi[..., 3:].astype(np.uint16)
+    roi[:] = ((sprite_roi[..., :3] * alpha + roi * (255 - alpha) + 127) // 255).astype(np.uint8)
+    return frame
+
+
+@lru_cache(maxsize=64)
+def subtitle_layer(text: str, font: ImageFont.FreeTypeFont, stroke_width: int,
+                   font_color: str, stroke_color: str,
+                   width: int, height: int) -> Optional[Tuple[np.ndarray, int, int]]:
+    """
+    字幕在指定尺寸画面上的最终图层（按文本缓存，同一句字幕的所有帧共用）
     
-    with image_cache_lock:
-        image_cache[image_path] = img
+    贴图已裁剪到画面范围内，位置为屏幕下方1/3区域的中心（居中对齐）。
     
-    return img.copy()
+    Returns:
+        (C连续的BGRA贴图, x, y)，空白字幕或完全在画面外时返回None
+    """
+    if not text.strip():
+        return None
+    
+    sprite, offset_x, offset_y = render_subtitle_sprite(text, font, stroke_width, font_color, stroke_color)
+    
+    # 计算字幕位置（屏幕下方1/3区域的中心，居中对齐）
+    text_width = sprite.shape[1] - 2 * stroke_width
+    x = (width - text_width) // 2 + offset_x
+    y = height * 2 // 3 + offset_y
+    
+    # 裁剪掉画面外的部分，合成时不再需要逐像素判断边界
+    sprite_h, sprite_w = sprite.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + sprite_w), min(height, y + sprite_h)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    sprite = np.ascontiguousarray(sprite[y0 - y:y1 - y, x0 - x:x1 - x])
+    return sprite, x0, y0
 
 
-def create_subtitle_overlay_from_rst(frame, rst_renderer, current_time, stroke_width=2):
+def create_subtitle_overlay_from_rst(frame, rst_renderer, current_time):
     """从RST渲染器创建字幕叠加（优化版本）"""
     height, width = frame.shape[:2]
     
     # 获取当前时间的字幕文本
     subtitle_text = rst_renderer.get_subtitle_at_time(current_time)
     
-    if not subtitle_text.strip():
+    # 获取缓存的字幕图层（字体和样式在渲染器初始化时已确定）
+    layer = subtitle_layer(
+        subtitle_text, rst_renderer.font, rst_renderer.stroke_width,
+        rst_renderer.font_color, rst_renderer.stroke_color, width, height
+    )
+    if layer is None:
         return frame
     
-    # 创建PIL图像
-    pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(pil_image)
-    
-    # 获取样式配置
-    style_config = rst_renderer.get_style_config()
-    font_path = style_config['font_family']
-    font_size = style_config['font_size']
-    
-    # 使用缓存的字体
-    font = get_cached_font(font_path, font_size)
-    
-    # 获取文本尺寸
-    bbox = draw.textbbox((0, 0), subtitle_text, font=font)
-    text_width = bbox[2] - bbox[0]
-    
-    # 计算字幕位置（屏幕下方1/3区域的中心）
-    subtitle_area_start = height * 2 // 3
-    
-    # 计算位置（居中对齐）
-    x = (width - text_width) // 2
-    y = subtitle_area_start
-    
-    # 绘制描边
-    stroke_width = style_config['stroke_width']
-    for dx in range(-stroke_width, stroke_width + 1):
-        for dy in range(-stroke_width, stroke_width + 1):
-            if dx != 0 or dy != 0:
-                draw.text((x + dx, y + dy), subtitle_text, font=font, fill=(0, 0, 0))
-    
-    # 绘制主文字
-    draw.text((x, y), subtitle_text, font=font, fill=(255, 255, 255))
-    
-    # 转换回OpenCV格式
-    return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+    sprite, x, y = layer
+    return blit_sprite(frame, sprite, x, y)
 
 
 def get_audio_duration(audio_path):
-    """获取音频文件时长"""
+    """获取音频文件时长（只读取文件头，不打开音频解码进程）"""
     if not os.path.exists(audio_path):
         return 3.0  # 默认时长
+    # WAV直接读取文件头
+    if audio_path.lower().endswith('.wav'):
+        try:
+            with wave.open(audio_path, 'rb') as w:
+                return w.getnframes() / w.getframerate()
+        except (wave.Error, EOFError):
+            pass
     try:
-        audio_clip = AudioFileClip(audio_path)
-        duration = audio_clip.duration
-        audio_clip.close()
-        return duration
+        return ffmpeg_parse_infos(audio_path)['duration']
     except:
         return 3.0
 
 
-def render_frame_batch(frame_batch_info: List[Tuple[int, float]], 
-                      all_segments: List[Dict], 
-                      complete_rst_renderer: SubtitleRenderer,
-                      width: int, height: int, fps: int,
-                      shot: str,
-                      zoom_factor_start: float = 1.0, 
-                      zoom_factor_end: float = 1.05) -> List[Tuple[int, np.ndarray]]:
-    """渲染一批帧（线程安全）- 使用多样化Ken Burns特效"""
+def get_scene_bounds(all_segments: List[Dict]) -> Dict[int, Tuple[float, float]]:
+    """计算每个场景的开始和结束时间（场景内所有字幕片段的范围）"""
+    scene_bounds = {}
+    for segment in all_segments:
+        start, end = scene_bounds.get(segment['scene'], (segment['start_time'], segment['end_time']))
+        scene_bounds[segment['scene']] = (min(start, segment['start_time']), max(end, segment['end_time']))
+    return scene_bounds
+
+
+def split_frames_by_scene(all_segments: List[Dict], total_frames: int, fps: int,
+                          batch_size: int) -> List[Tuple[int, float, float, List[Tuple[int, float]]]]:
+    """
+    按场景把帧分成渲染任务（每个任务只包含同一场景的连续帧，最多batch_size帧）
+    
+    每帧所在的片段用np.searchsorted一次性查出（第一个结束时间晚于帧时间、
+    且已经开始的片段）；不在任何片段内的帧按场景1、时长3秒处理。
+    
+    Returns:
+        [(场景编号, 场景开始时间, 场景结束时间, [(帧序号, 帧时间), ...]), ...]
+    """
+    scene_bounds = get_scene_bounds(all_segments)
+    segments = sorted(all_segments, key=lambda seg: seg['start_time'])
+    
+    # 末尾追加一个永不开始的哨兵片段，落在所有片段之后的帧不需要单独判断
+    seg_start = np.array([seg['start_time'] for seg in segments] + [np.inf], dtype=np.float64)
+    seg_end = np.array([seg['end_time'] for seg in segments], dtype=np.float64)
+    seg_scene = np.array([seg['scene'] for seg in segments] + [-1], dtype=np.int64)
+    
+    times = np.arange(total_frames) / fps
+    seg_idx = np.searchsorted(seg_end, times, side='right')
+    frame_scenes = np.where(seg_start[seg_idx] <= times, seg_scene[seg_idx], -1)
+    
+    tasks = []
+    for frame_idx, (current_time, scene) in enumerate(zip(times.tolist(), frame_scenes.tolist())):
+        if scene >= 0:
+            scene_number = scene
+            scene_start_time, scene_end_time = scene_bounds[scene_number]
+        else:
+            scene_number, scene_start_time, scene_end_time = 1, 0, 3.0
+        
+        if (not tasks or tasks[-1][:3] != (scene_number, scene_start_time, scene_end_time)
+                or len(tasks[-1][3]) >= batch_size):
+            tasks.append((scene_number, scene_start_time, scene_end_time, []))
+        tasks[-1][3].append((frame_idx, current_time))
+    
+    return tasks
+
+
+def render_scene_frames(scene_number: int, frame_batch_info: List[Tuple[int, float]],
+                        scene_start_time: float, scene_end_time: float,
+                        complete_rst_renderer: SubtitleRenderer,
+                        width: int, height: int,
+                        scene_images: np.ndarray,
+                        frame_pool: Optional[FramePool] = None,
+                        pix_fmt: str = 'bgr24') -> List[Tuple[int, np.ndarray]]:
+    """
+    渲染同一场景内的一批帧（线程安全）- 使用多样化Ken Burns特效
+    
+    场景图片、特效类型和场景时长在整批帧中只确定一次；平移特效的缩放倍数
+    固定，只放大一次图像，之后每帧只做裁剪。与上一帧的特效视图和字幕都相同
+    的帧直接复制上一帧，不重新渲染。指定frame_pool时每帧直接渲染到池中的
+    缓冲里，由使用方写出后归还。scene_images为preload_images返回的按场景
+    编号索引的图像数组。pix_fmt为yuv420p时特效和字幕先在BGR临时缓冲中合成，
+    再转换为I420写入输出缓冲（编码器无需再做颜色转换）。
+    """
     rendered_frames = []
+    to_yuv = pix_fmt == 'yuv420p'
+    bgr_scratch = None
+    
+    # 对应场景的图片（预加载数组中的只读切片）
+    img = scene_images[scene_number]
+    
+    # 计算场景内的Ken Burns效果进度（从场景开始到场景结束）
+    scene_duration = scene_end_time - scene_start_time
+    if scene_duration <= 0:
+        scene_duration = 1.0
     
+    # 根据场景选择Ken Burns特效类型（循环使用预定义序列）
+    effect_type = EFFECT_SEQUENCE[(scene_number - 1) % len(EFFECT_SEQUENCE)]
+    effect_id = EFFECT_IDS.get(effect_type, 0)
+    
+    zoomed_img = None
+    if effect_id in PAN_EFFECT_IDS:
+        zoom = ken_burns_params(0.0, effect_id, width, height)[0]
+        zoomed_img = cv2.resize(img, (int(width * zoom), int(height * zoom)))
+    
+    prev_key, prev_frame = None, None
     for frame_idx, current_time in frame_batch_info:
-        # 确定当前时间对应的场景和场景信息
-        scene_number = 1
-        scene_start_time = 0
-        scene_end_time = 0
-        
-        # 找到当前场景的完整信息
-        for i, segment in enumerate(all_segments):
-            if segment['start_time'] <= current_time < segment['end_time']:
-                scene_number = segment['scene']
-                # 找到这个场景的开始和结束时间
-                scene_segments = [seg for seg in all_segments if seg['scene'] == scene_number]
-                scene_start_time = min(seg['start_time'] for seg in scene_segments)
-                scene_end_time = max(seg['end_time'] for seg in scene_segments)
-                break
-        
-        # 如果没有找到匹配的段，使用默认值
-        if scene_end_time == 0:
-            scene_end_time = scene_start_time + 3.0
-        
-        # 加载对应场景的图片（使用缓存）
-        img = get_cached_image(shot, scene_number, width, height)
-        
-        # 计算场景内的Ken Burns效果进度（从场景开始到场景结束）
-        scene_duration = scene_end_time - scene_start_time
-        if scene_duration <= 0:
-            scene_duration = 1.0
-        
         # 计算当前时间在整个场景中的进度（0.0 到 1.0）
         scene_progress = (current_time - scene_start_time) / scene_duration
-        scene_progress = max(0, min(1, scene_progress))  # 限制在0-1之间
+        scene_progress = max(0.0, min(1.0, scene_progress))  # 限制在0-1之间
+        eased_progress = easing_function(scene_progress)
+        
+        if zoomed_img is not None:
+            _, start_x, start_y, _ = ken_burns_params(eased_progress, effect_id, width, height)
+            x0, y0 = int(start_x), int(start_y)
+            key = (x0, y0)
+        else:
+            key = ken_burns_frame_key(img, effect_id, eased_progress, width, height)
+        key = (key, complete_rst_renderer.get_subtitle_at_time(current_time))
+        
+        out = frame_pool.acquire() if frame_pool is not None else None
+        if key == prev_key:
+            # 画面与上一帧完全相同，直接复制
+            if out is None:
+                frame = prev_frame.copy()
+            else:
+                np.copyto(out, prev_frame)
+                frame = out
+            rendered_frames.append((frame_idx, frame))
+            continue
         
-        # 根据场景选择Ken Burns特效类型（循环使用预定义序列）
-        effect_type = EFFECT_SEQUENCE[(scene_number - 1) % len(EFFECT_SEQUENCE)]
+        render_out = out
+        if to_yuv:
+            if bgr_scratch is None:
+                bgr_scratch = np.empty((height, width, 3), dtype=np.uint8)
+            render_out = bgr_scratch
         
         # 应用Ken Burns特效（持续时间与场景匹配，从场景开始立即执行）
-        frame = apply_ken_burns_effect(
-            img, scene_progress, effect_type, width, height
-        )
+        if zoomed_img is not None:
+            view = zoomed_img[y0:y0+height, x0:x0+width]
+            if render_out is None:
+                frame = np.ascontiguousarray(view)
+            else:
+                np.copyto(render_out, view)
+                frame = render_out
+        else:
+            frame = render_ken_burns(img, effect_id, eased_progress, width, height, render_out)
         
         # 添加字幕（使用完整的RST渲染器）
         frame = create_subtitle_overlay_from_rst(
-            frame, complete_rst_renderer, current_time, stroke_width=3
+            frame, complete_rst_renderer, current_time
         )
         
+        if to_yuv:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420, dst=out)
+        
+        prev_key, prev_frame = key, frame
         rendered_frames.append((frame_idx, frame))
     
     return rendered_frames
 
 
+class SharedFrameSlots:
+    """
+    共享内存中一组固定的输出帧缓冲（进程渲染模式使用）
+    
+    接口与FramePool相同，render_scene_frames可以直接渲染到共享内存里，
+    主进程按槽位读取，帧数据不经过进程间管道。
+    """
+    
+    def __init__(self, slots: np.ndarray):
+        self.slots = slots
+        self.acquired: List[np.ndarray] = []
+    
+    def acquire(self) -> np.ndarray:
+        """按顺序取下一个槽位"""
+        slot = self.slots[len(self.acquired)]
+        self.acquired.append(slot)
+        return slot
+    
+    def release(self, frame: np.ndarray) -> None:
+        """槽位由主进程统一复用，无需归还"""
+
+
+# 渲染子进程的状态（由_init_render_worker在每个子进程中设置一次）
+_worker_state: Dict[str, object] = {}
+
+
+def _create_shared_array(shape: Tuple[int, ...]) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """创建共享内存块，并包装成指定形状的uint8数组"""
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape))))
+    return shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+
+def _init_render_worker(images_shm_name: str, images_shape: Tuple[int, ...],
+                        output_shm_name: str, output_shape: Tuple[int, ...],
+                        rst_path: str, width: int, height: int, pix_fmt: str) -> None:
+    """
+    渲染子进程初始化：挂载共享内存中的场景图像和输出槽位，
+    并在本进程内创建字幕渲染器（字体对象不能跨进程传递）
+    """
+    images_shm = shared_memory.SharedMemory(name=images_shm_name)
+    output_shm = shared_memory.SharedMemory(name=output_shm_name)
+    scene_images = np.ndarray(images_shape, dtype=np.uint8, buffer=images_shm.buf)
+    scene_images.setflags(write=False)
+    
+    _worker_state.update(
+        images_shm=images_shm,  # 保持引用，避免共享内存被提前关闭
+        output_shm=output_shm,
+        scene_images=scene_images,
+        output=np.ndarray(output_shape, dtype=np.uint8, buffer=output_shm.buf),
+        renderer=SubtitleRenderer(rst_path),
+        width=width,
+        height=height,
+        pix_fmt=pix_fmt,
+    )
+
+
+def _render_batch_in_worker(slot_group: int, scene_number: int,
+                            frame_batch_info: List[Tuple[int, float]],
+                            scene_start_time: float, scene_end_time: float) -> int:
+    """
+    在渲染子进程中渲染一批帧，结果写入共享内存的第slot_group组槽位
+    
+    Returns:
+        渲染的帧数
+    """
+    state = _worker_state
+    slots = SharedFrameSlots(state['output'][slot_group])
+    frames = render_scene_frames(
+        scene_number, frame_batch_info,
+        scene_start_time, scene_end_time,
+        state['renderer'],
+        state['width'], state['height'],
+        state['scene_images'],
+        slots,
+        state['pix_fmt']
+    )
+    # 个别帧（如字幕合成返回新数组）不在槽位里时补一次复制
+    for slot, (_, frame) in zip(slots.acquired, frames):
+        if frame is not slot:
+            np.copyto(slot, frame)
+    return len(frames)
+
+
+def loop_audio_clip(clip: AudioClip, duration: float) -> AudioClip:
+    """
+    循环播放音频到指定时长（时间按原音频时长取模，只引用同一个音频）
+    
+    跨越循环点的采样块按回绕位置拆开读取，每段时间都是递增的。
+    """
+    def frame_function(t):
+        t = np.mod(t, clip.duration)
+        if np.ndim(t) == 0:
+            return clip.get_frame(t)
+        wraps = np.flatnonzero(np.diff(t) < 0) + 1
+        if not len(wraps):
+            return clip.get_frame(t)
+        return np.concatenate([clip.get_frame(part) for part in np.split(t, wraps)])
+    
+    return AudioClip(frame_function, duration=duration, fps=clip.fps)
+
+
 def load_audio_clips_concurrent(shot: str, scene_durations: Dict[int, float]) -> List[AudioFileClip]:
     """并发加载音频文件"""
     print("并发加载音频文件...")
@@ -579,8 +1013,57 @@ def load_audio_clips_concurrent(shot: str, scene_durations: Dict[int, float]) ->
     return voice_clips
 
 
-def create_complete_video(shot="shot_02"):
-    """创建完整视频（多线程优化版本 - 直接输出最终视频）"""
+def open_ffmpeg_writer(output_path: str, width: int, height: int, fps: int,
+                       audio_path: Optional[str] = None, threads: int = 0,
+                       video_codec: str = 'libx264', pix_fmt: str = 'bgr24') -> subprocess.Popen:
+    """
+    启动ffmpeg编码进程，通过stdin接收原始帧（一次编码完成视频和音频）
+    
+    Args:
+        output_path: 输出视频路径
+        width: 视频宽度
+        height: 视频高度
+        fps: 帧率
+        audio_path: 需要一起封装的音频文件，None表示无声视频
+        threads: 编码线程数（0表示由ffmpeg自动决定）
+        video_codec: 视频编码器（GPU模式下为h264_nvenc）
+        pix_fmt: 输入帧的像素格式（bgr24或yuv420p，见frame_shape）
+    
+    Returns:
+        ffmpeg进程
+    """
+    command = [
+        FFMPEG_BINARY, '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', pix_fmt,
+        '-s', f'{width}x{height}', '-r', str(fps),
+        '-i', '-',
+    ]
+    if audio_path:
+        command += ['-i', audio_path]
+    
+    command += ['-map', '0:v', '-c:v', video_codec, '-preset', 'medium', '-pix_fmt', 'yuv420p']
+    if audio_path:
+        command += ['-map', '1:a', '-c:a', 'aac', '-shortest']
+    command += ['-threads', str(threads), output_path]
+    
+    return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+
+def create_complete_video(shot="shot_02", max_workers: Optional[int] = None,
+                          use_processes: bool = False) -> Optional[str]:
+    """
+    创建完整视频（多线程优化版本 - 直接输出最终视频）
+    
+    Args:
+        shot: 分集名称，如 'shot_01'
+        max_workers: 渲染和编码使用的线程数，None表示按CPU核心数自动决定
+        use_processes: 使用多进程渲染帧（场景图像和输出帧放在共享内存中，
+            进程间只传递帧序号和时间）；GPU模式下不生效
+    
+    Returns:
+        输出视频路径，失败时返回None
+    """
+    global USE_GPU
     print(f"=== 开始创建完整视频（{shot} - 多线程版本） ===")
     start_time = time.time()
     
@@ -588,6 +1071,14 @@ def create_complete_video(shot="shot_02"):
     config = load_config()
     captions = load_captions(shot)
     
+    # 配置启用GPU且有可用的CUDA设备时使用GPU路径，否则回退到CPU
+    USE_GPU = CUDA_AVAILABLE and config.get('performance_settings', {}).get('use_gpu', False)
+    print(f"渲染设备: {'GPU (CUDA + NVENC)' if USE_GPU else 'CPU'}")
+    # GPU上下文不能在子进程间共享，GPU模式下仍使用线程渲染
+    use_processes = use_processes and not USE_GPU
+    # 显存中的原图按主机内存地址区分，上一次渲染的图像数组已释放，先清空
+    _gpu_sources.clear()
+    
     if not captions:
         print("错误：没有找到字幕内容")
         return
@@ -629,85 +1120,19 @@ def create_complete_video(shot="shot_02"):
     total_frames = int(total_duration * fps)
     print(f"总帧数: {total_frames}")
     
-    # 预加载图像资源
-    scene_count = len(set(seg['scene'] for seg in all_segments))
-    preload_images(shot, scene_count, width, height)
-    
-    # Ken Burns效果参数
-    zoom_factor_start = 1.0
-    zoom_factor_end = 1.05  # 5%缩放
-    
-    print("开始多线程渲染视频帧...")
+    # 预加载图像资源（按最大场景编号加载，保证每个场景编号都能直接索引）
+    max_scene = max((seg['scene'] for seg in all_segments), default=0)
+    scene_images = preload_images(shot, max_scene, width, height)
     
     # 确定线程数（基于CPU核心数，但不超过合理上限）
-    import multiprocessing
-    cpu_count = multiprocessing.cpu_count()
-    max_workers = min(cpu_count, 8)  # 限制最大线程数为8，避免过度竞争
-    batch_size = max(30, total_frames // (max_workers * 4))  # 动态批次大小
-    
-    # 准备帧批次
-    frame_batches = []
-    for i in range(0, total_frames, batch_size):
-        batch_end = min(i + batch_size, total_frames)
-        batch_info = [(j, j / fps) for j in range(i, batch_end)]
-        frame_batches.append(batch_info)
-    
-    print(f"分成 {len(frame_batches)} 个批次进行渲染")
-    
-    # 存储所有渲染好的帧
-    all_rendered_frames = {}
-    
-    # 使用ThreadPoolExecutor进行多线程渲染
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 提交所有批次任务
-        future_to_batch = {
-            executor.submit(
-                render_frame_batch, 
-                batch_info, 
-                all_segments, 
-                complete_rst_renderer,
-                width, height, fps,
-                shot,  # 传递shot参数
-                zoom_factor_start, zoom_factor_end
-            ): i for i, batch_info in enumerate(frame_batches)
-        }
-        
-        # 收集结果
-        completed_batches = 0
-        for future in as_completed(future_to_batch):
-            batch_idx = future_to_batch[future]
-            try:
-                batch_frames = future.result()
-                # 将批次结果存储到字典中
-                for frame_idx, frame in batch_frames:
-                    all_rendered_frames[frame_idx] = frame
-                
-                completed_batches += 1
-                progress = completed_batches / len(frame_batches) * 100
-                print(f"  渲染进度: {progress:.1f}% (完成批次 {completed_batches}/{len(frame_batches)})")
-                
-            except Exception as e:
-                print(f"批次 {batch_idx} 渲染失败: {e}")
-    
-    # 创建VideoClip从渲染的帧
-    print("创建视频片段...")
-    
-    def make_frame(t):
-        """根据时间返回对应的帧"""
-        frame_idx = int(t * fps)
-        if frame_idx in all_rendered_frames:
-            frame = all_rendered_frames[frame_idx]
-            # 转换BGR到RGB（MoviePy需要RGB格式）
-            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        else:
-            # 如果帧不存在，返回黑色帧
-            return np.zeros((height, width, 3), dtype=np.uint8)
-    
-    # 创建视频片段
-    from moviepy import VideoClip
-    video_clip = VideoClip(make_frame, duration=total_duration)
-    
-    # 并发处理音频
+    if max_workers is None:
+        cpu_count = os.cpu_count() or 1
+        max_workers = min(cpu_count, 8)  # 限制最大线程数为8，避免过度竞争
+    # 每批渲染1秒的帧；同时在途的批次数有上限，内存占用与视频总时长无关
+    batch_size = fps
+    max_in_flight = max_workers + 1
+    
+    # 先准备音频，编码时由ffmpeg与视频一起封装
     print("开始并发处理音频...")
     
     # 计算场景时长
@@ -725,22 +1150,23 @@ def create_complete_video(shot="shot_02"):
     # 处理背景音乐（在单独线程中）
     def process_background_music():
         bg_music_path = "assets/pianai.mp3"
+        bg_volume = 0.3
         if os.path.exists(bg_music_path):
             try:
-                bg_music_clip = AudioFileClip(bg_music_path)
+                key = (bg_music_path, bg_volume)
+                if key not in _BG_CACHE:
+                    _BG_CACHE[key] = AudioFileClip(bg_music_path).with_volume_scaled(bg_volume)
+                bg_music_clip = _BG_CACHE[key]
                 print(f"背景音乐时长: {bg_music_clip.duration:.2f}s, 需要时长: {total_duration:.2f}s")
                 
                 if bg_music_clip.duration < total_duration:
                     # 循环背景音乐
                     loops_needed = int(np.ceil(total_duration / bg_music_clip.duration))
                     print(f"需要循环背景音乐 {loops_needed} 次")
-                    bg_clips = [bg_music_clip] * loops_needed
-                    bg_music = concatenate_audioclips(bg_clips)
+                    bg_music = loop_audio_clip(bg_music_clip, total_duration)
                 else:
-                    bg_music = bg_music_clip
-                
-                # 裁剪到准确时长
-                bg_music = bg_music.subclipped(0, total_duration).with_volume_scaled(0.3)
+                    # 裁剪到准确时长
+                    bg_music = bg_music_clip.subclipped(0, total_duration)
                 print("背景音乐处理完成")
                 return bg_music
                 
@@ -754,99 +1180,508 @@ def create_complete_video(shot="shot_02"):
         bg_music_future = executor.submit(process_background_music)
         bg_music = bg_music_future.result()
     
-    # 合成最终音频并附加到视频
-    if voice_clips or bg_music:
+    final_output_path = f"videos/{shot}.mp4"
+    os.makedirs("videos", exist_ok=True)
+    
+    # 合成最终音频，写成临时WAV供ffmpeg封装
+    final_audio_path = None
+    final_audio_clips = []
+    if voice_clips:
+        # 合成所有配音
+        final_audio_clips.append(CompositeAudioClip(voice_clips))
+        print("配音合成完成")
+    if bg_music:
+        final_audio_clips.append(bg_music)
+        print("添加背景音乐")
+    
+    if final_audio_clips:
         try:
-            final_audio_clips = []
-            
-            if voice_clips:
-                # 合成所有配音
-                voice_audio = CompositeAudioClip(voice_clips)
-                final_audio_clips.append(voice_audio)
-                print("配音合成完成")
-            
-            if bg_music:
-                final_audio_clips.append(bg_music)
-                print("添加背景音乐")
-            
-            # 最终音频合成
             if len(final_audio_clips) > 1:
                 final_audio = CompositeAudioClip(final_audio_clips)
             else:
                 final_audio = final_audio_clips[0]
-            
-            # 将音频附加到视频
-            final_video = video_clip.with_audio(final_audio)
-            
-            # 直接保存最终视频
-            final_output_path = f"videos/{shot}.mp4"
-            os.makedirs("videos", exist_ok=True)
-            
-            print("开始写入最终视频文件...")
-            final_video.write_videofile(
-                final_output_path,
-                codec='libx264',
-                audio_codec='aac',
-                fps=fps,
-                threads=max_workers  # 使用多线程编码
-            )
-            
-            # 清理资源
-            video_clip.close()
-            final_video.close()
-            if bg_music:
-                bg_music.close()
-            for clip in voice_clips:
-                clip.close()
-            
-            end_time = time.time()
-            total_time = end_time - start_time
-            
-            print(f"\n=== {shot} 完整视频创建成功（多线程优化版本） ===")
-            print(f"输出文件: {final_output_path}")
-            print(f"字幕文件: {complete_rst_path}")
-            print(f"总时长: {total_duration:.2f} 秒")
-            print(f"分辨率: {width}x{height}")
-            print(f"帧率: {fps} fps")
-            print(f"包含 {len(set(seg['scene'] for seg in all_segments))} 个场景")
-            print(f"字幕片段: {len(all_segments)} 个")
-            print(f"渲染时间: {total_time:.2f} 秒")
-            print(f"渲染效率: {total_frames/total_time:.1f} 帧/秒")
-            print(f"使用线程数: {max_workers}")
-            
+            final_audio_path = f"videos/{shot}_audio.wav"
+            final_audio.write_audiofile(final_audio_path, fps=44100, logger=None)
         except Exception as e:
-            print(f"视频合成失败: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"音频合成失败，将创建无声视频: {e}")
+            final_audio_path = None
     else:
         print("没有音频内容，创建无声视频")
-        final_output_path = f"videos/{shot}.mp4"
-        os.makedirs("videos", exist_ok=True)
+    
+    print(f"开始{'多进程' if use_processes else '多线程'}渲染视频帧...")
+    
+    # 按场景准备帧批次（每批只包含同一场景的帧）
+    frame_batches = split_frames_by_scene(all_segments, total_frames, fps, batch_size)
+    
+    print(f"分成 {len(frame_batches)} 个批次进行渲染")
+    
+    # CPU渲染时各渲染线程直接输出I420（yuv420p），编码器无需颜色转换，管道数据量减半；
+    # GPU模式下帧从显存直接下载到锁页缓冲，仍按BGR送入编码器
+    pix_fmt = 'bgr24' if USE_GPU else 'yuv420p'
+    
+    # 帧通过管道直接送入ffmpeg编码
+    encoder = open_ffmpeg_writer(
+        final_output_path, width, height, fps,
+        audio_path=final_audio_path, threads=max_workers,
+        video_codec='h264_nvenc' if USE_GPU else 'libx264',
+        pix_fmt=pix_fmt
+    )
+    black_frame = np.zeros((height, width, 3), dtype=np.uint8)
+    if pix_fmt == 'yuv420p':
+        black_frame = cv2.cvtColor(black_frame, cv2.COLOR_BGR2YUV_I420)
+    
+    # 渲染输出缓冲在渲染线程和写帧线程之间循环使用
+    frame_pool = FramePool(width, height, page_locked=USE_GPU, pix_fmt=pix_fmt)
+    
+    # 写帧线程：从有界队列取帧写入ffmpeg，渲染与管道写入并行
+    frame_queue = queue.Queue(maxsize=8)
+    write_errors = []
+    
+    def write_frames():
+        while True:
+            frame = frame_queue.get()
+            if frame is None:
+                break
+            # 编码进程出错后只消费队列避免渲染线程阻塞，缓冲照常归还
+            if not write_errors:
+                try:
+                    encoder.stdin.write(frame.data)
+                except OSError as e:
+                    write_errors.append(e)
+            if frame is not black_frame:
+                frame_pool.release(frame)
+    
+    writer = threading.Thread(target=write_frames, daemon=True)
+    writer.start()
+    
+    shared_blocks = []
+    try:
+        try:
+            if use_processes:
+                # 场景图像复制到共享内存，子进程直接挂载，无需重新读取和缩放；
+                # 每个在途批次占用一组输出槽位，批次i使用第i % max_in_flight组
+                images_shm, shared_images = _create_shared_array(scene_images.shape)
+                shared_blocks.append(images_shm)
+                np.copyto(shared_images, scene_images)
+                del shared_images
+                output_shm, shared_output = _create_shared_array(
+                    (max_in_flight, batch_size) + frame_shape(width, height, pix_fmt))
+                shared_blocks.append(output_shm)
+                # 写帧线程已在运行，fork会复制它持有的锁，子进程一律用spawn方式启动
+                executor = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_render_worker,
+                    initargs=(images_shm.name, scene_images.shape, output_shm.name, shared_output.shape,
+                              complete_rst_path, width, height, pix_fmt)
+                )
+            else:
+                executor = ThreadPoolExecutor(max_workers=max_workers)
+            
+            with executor:
+                def submit_batch(batch_idx):
+                    scene_number, scene_start_time, scene_end_time, batch_info = frame_batches[batch_idx]
+                    if use_processes:
+                        return executor.submit(
+                            _render_batch_in_worker,
+                            batch_idx % max_in_flight,
+                            scene_number,
+                            batch_info,
+                            scene_start_time, scene_end_time
+                        )
+                    return executor.submit(
+                        render_scene_frames,
+                        scene_number,
+                        batch_info,
+                        scene_start_time, scene_end_time,
+                        complete_rst_renderer,
+                        width, height,
+                        scene_images,
+                        frame_pool,
+                        pix_fmt
+                    )
+                
+                # 批次按帧顺序提交、按提交顺序取结果，帧直接按顺序写出，无需重排缓冲；
+                # 只有最前面的max_in_flight个批次在渲染或等待写出
+                in_flight = deque()
+                next_batch = 0
+                progress_interval = max(1, len(frame_batches) // 10)
+                for batch_idx in range(len(frame_batches)):
+                    if write_errors:
+                        # 编码进程已出错，剩余批次不再渲染（已开始的批次由with退出时等待完成）
+                        for future in in_flight:
+                            future.cancel()
+                        print(f"编码进程写入失败，停止渲染（完成批次 {batch_idx}/{len(frame_batches)}）")
+                        break
+                    
+                    while next_batch < len(frame_batches) and len(in_flight) < max_in_flight:
+                        in_flight.append(submit_batch(next_batch))
+                        next_batch += 1
+                    
+                    try:
+                        result = in_flight.popleft().result()
+                        if use_processes:
+                            # 槽位组在下一轮提交时复用，先复制到写帧缓冲
+                            frames = []
+                            for slot in shared_output[batch_idx % max_in_flight][:result]:
+                                frame = frame_pool.acquire()
+                                np.copyto(frame, slot)
+                                frames.append(frame)
+                        else:
+                            frames = [frame for _, frame in result]
+                    except Exception as e:
+                        print(f"批次 {batch_idx} 渲染失败: {e}")
+                        frames = [black_frame] * len(frame_batches[batch_idx][3])
+                    
+                    for frame in frames:
+                        frame_queue.put(frame)
+                    del frames
+                    
+                    # 批次较小，大约每10%输出一次进度
+                    completed_batches = batch_idx + 1
+                    if completed_batches % progress_interval == 0 or completed_batches == len(frame_batches):
+                        progress = completed_batches / len(frame_batches) * 100
+                        print(f"  渲染进度: {progress:.1f}% (完成批次 {completed_batches}/{len(frame_batches)})")
+        finally:
+            # 通知写帧线程结束并等待队列写完
+            frame_queue.put(None)
+            writer.join()
+            frame_pool.close()
+            _gpu_sources.clear()
+            # 释放共享内存（先去掉引用共享内存的数组）
+            shared_output = None
+            for shm in shared_blocks:
+                shm.close()
+                shm.unlink()
         
-        video_clip.write_videofile(
-            final_output_path,
-            codec='libx264',
-            fps=fps,
-            threads=max_workers
-        )
+        if write_errors:
+            raise write_errors[0]
         
-        video_clip.close()
+        encoder.stdin.close()
+        encoder.wait()
+        
+        if encoder.returncode != 0:
+            raise RuntimeError(f"ffmpeg编码失败，返回码: {encoder.returncode}")
         
         end_time = time.time()
         total_time = end_time - start_time
+        
+        print(f"\n=== {shot} 完整视频创建成功（多线程优化版本） ===")
         print(f"输出文件: {final_output_path}")
+        print(f"字幕文件: {complete_rst_path}")
+        print(f"总时长: {total_duration:.2f} 秒")
+        print(f"分辨率: {width}x{height}")
+        print(f"帧率: {fps} fps")
+        print(f"包含 {len(set(seg['scene'] for seg in all_segments))} 个场景")
+        print(f"字幕片段: {len(all_segments)} 个")
         print(f"渲染时间: {total_time:.2f} 秒")
         print(f"渲染效率: {total_frames/total_time:.1f} 帧/秒")
+        print(f"使用{'进程' if use_processes else '线程'}数: {max_workers}")
+        print(f"Pillow版本: {PIL.__version__}{'（SIMD）' if PILLOW_SIMD else ''}")
+        
+        return final_output_path
+        
+    except Exception as e:
+        print(f"视频合成失败: {e}")
+        import traceback
+        traceback.print_exc()
+        if encoder.poll() is None:
+            encoder.kill()
+        return None
+    
+    finally:
+        # 清理资源（背景音乐与缓存共用读取器，不在这里关闭）
+        for clip in voice_clips:
+            clip.close()
+        if final_audio_path and os.path.exists(final_audio_path):
+            os.remove(final_audio_path)
+
+
+def ass_time(seconds: float) -> str:
+    """把秒数转换为ASS时间格式 H:MM:SS.cc"""
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+def hex_to_ass_color(color: str) -> str:
+    """把#RRGGBB颜色转换为ASS的&H00BBGGRR格式"""
+    b, g, r = hex_to_bgr(color)
+    return f"&H00{b:02X}{g:02X}{r:02X}"
+
+
+def generate_ass_file(segments: List[Dict], style_config: Dict, output_path: str,
+                      width: int, height: int, font_name: str = "Microsoft YaHei") -> str:
+    """
+    根据字幕时间信息生成ASS字幕文件（样式与逐帧渲染的字幕一致）
+    
+    Args:
+        segments: 字幕片段信息（text/start_time/end_time）
+        style_config: 字幕样式配置
+        output_path: 输出ASS文件路径
+        width: 视频宽度
+        height: 视频高度
+        font_name: 字体名称
+    
+    Returns:
+        ASS文件路径
+    """
+    # 顶部居中对齐，文字顶边位于屏幕下方1/3处
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, OutlineColour, BackColour, "
+        "Bold, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV",
+        f"Style: Default,{font_name},{style_config.get('font_size', 70)},"
+        f"{hex_to_ass_color(style_config.get('font_color', '#FFFFFF'))},"
+        f"{hex_to_ass_color(style_config.get('stroke_color', '#000000'))},&H00000000,"
+        f"0,1,{style_config.get('stroke_width', 3)},0,8,0,0,{height * 2 // 3}",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Text",
+    ]
+    for segment in segments:
+        lines.append(
+            f"Dialogue: 0,{ass_time(segment['start_time'])},{ass_time(segment['end_time'])},"
+            f"Default,{segment['text']}"
+        )
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return output_path
+
+
+def escape_filter_path(path: str) -> str:
+    """转义ffmpeg滤镜参数中的路径（Windows盘符冒号、反斜杠）"""
+    return path.replace('\\', '/').replace(':', '\\:').replace("'", "\\'")
+
+
+def create_quick_video(shot="shot_02") -> Optional[str]:
+    """
+    快速预览：完全由ffmpeg滤镜完成渲染，Python不逐帧处理
+    
+    每个场景的图片用zoompan做缩放，concat拼接后用ass滤镜烧录字幕；
+    配音按场景顺序拼接，再与循环的背景音乐amix混音。
+    特效只有统一的缓慢放大，正式输出仍使用create_complete_video。
+    
+    Args:
+        shot: 分集名称
+    
+    Returns:
+        输出视频路径，失败时返回None
+    """
+    print(f"=== 开始快速渲染（{shot} - ffmpeg滤镜版本） ===")
+    start_time = time.time()
+    
+    config = load_config()
+    captions = load_captions(shot)
+    if not captions:
+        print("错误：没有找到字幕内容")
+        return None
+    
+    fps = config['video_settings']['fps']
+    width = 1440
+    height = 1920
+    
+    # 生成字幕时间信息（与完整渲染共用RST文件）
+    audio_files = [f"assets/{shot}/audios/{shot}_{i}.wav" for i in range(1, len(captions) + 1)]
+    complete_rst_path = f"assets/{shot}/subtitles/{shot}_complete_video.rst"
+    os.makedirs(os.path.dirname(complete_rst_path), exist_ok=True)
+    processor = SubtitleProcessor("config.json")
+    all_segments = processor.generate_complete_rst_file(captions, audio_files, complete_rst_path)
+    if not all_segments:
+        print("错误：没有字幕片段")
+        return None
+    
+    # 计算每个场景的时长
+    scene_bounds = {}
+    for segment in all_segments:
+        start, end = scene_bounds.get(segment['scene'], (segment['start_time'], segment['end_time']))
+        scene_bounds[segment['scene']] = (min(start, segment['start_time']), max(end, segment['end_time']))
+    scenes = sorted(scene_bounds)
+    total_duration = max(end for _, end in scene_bounds.values())
+    
+    os.makedirs("videos", exist_ok=True)
+    style_config = SubtitleRenderer(complete_rst_path).get_style_config()
+    ass_path = generate_ass_file(all_segments, style_config, f"videos/{shot}.ass", width, height)
+    # font_family是字体文件时让libass从其所在目录加载；是字体名称时由libass按名称查找
+    font_family = style_config['font_family']
+    fonts_dir = os.path.dirname(font_family) if os.path.isfile(font_family) else None
+    
+    inputs = []
+    video_filters = []
+    audio_filters = []
+    for k, scene in enumerate(scenes):
+        start, end = scene_bounds[scene]
+        duration = end - start
+        frames = max(1, int(round(duration * fps)))
+        
+        # 场景图片（单帧输入，zoompan展开为frames帧）
+        inputs += ['-i', f"assets/{shot}/images/{shot}_{scene}.png"]
+        video_filters.append(
+            f"[{2 * k}:v]scale={width}:{height},setsar=1,"
+            f"zoompan=z='1+0.15*on/{frames}':x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)'"
+            f":d={frames}:s={width}x{height}:fps={fps}[v{k}]"
+        )
+        
+        # 场景配音，缺失时用静音补齐
+        audio_path = f"assets/{shot}/audios/{shot}_{scene}.wav"
+        if os.path.exists(audio_path):
+            inputs += ['-i', audio_path]
+        else:
+            inputs += ['-f', 'lavfi', '-t', f"{duration:.3f}", '-i', 'anullsrc=r=44100:cl=stereo']
+        audio_filters.append(
+            f"[{2 * k + 1}:a]aresample=44100,aformat=channel_layouts=stereo,"
+            f"apad,atrim=0:{duration:.3f}[a{k}]"
+        )
+    
+    n = len(scenes)
+    filters = video_filters + audio_filters
+    ass_filter = f"ass='{escape_filter_path(ass_path)}'"
+    if fonts_dir:
+        ass_filter += f":fontsdir='{escape_filter_path(fonts_dir)}'"
+    filters.append(
+        "".join(f"[v{k}]" for k in range(n)) + f"concat=n={n}:v=1:a=0," + ass_filter + "[v]"
+    )
+    filters.append("".join(f"[a{k}]" for k in range(n)) + f"concat=n={n}:v=0:a=1[voice]")
+    
+    # 背景音乐循环输入，音量0.3，与配音混音
+    bg_music_path = "assets/pianai.mp3"
+    if os.path.exists(bg_music_path):
+        inputs += ['-stream_loop', '-1', '-i', bg_music_path]
+        filters.append(
+            f"[{2 * n}:a]aresample=44100,aformat=channel_layouts=stereo,volume=0.3[bg]"
+        )
+        filters.append("[voice][bg]amix=inputs=2:duration=first:normalize=0[a]")
+    else:
+        filters.append("[voice]anull[a]")
+    
+    final_output_path = f"videos/{shot}_quick.mp4"
+    command = [
+        FFMPEG_BINARY, '-y', '-loglevel', 'error', *inputs,
+        '-filter_complex', ';'.join(filters),
+        '-map', '[v]', '-map', '[a]',
+        '-c:v', 'libx264', '-preset', 'medium', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-t', f"{total_duration:.3f}", final_output_path
+    ]
+    
+    try:
+        subprocess.run(command, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"快速渲染失败: {e}")
+        return None
+    
+    print(f"快速渲染完成: {final_output_path}（{total_duration:.2f} 秒，耗时 {time.time() - start_time:.2f} 秒）")
+    return final_output_path
+
+
+def get_all_shots() -> List[str]:
+    """获取assets目录下所有带字幕文件的分集名称"""
+    shots = []
+    for name in sorted(os.listdir("assets")):
+        if os.path.exists(f"assets/{name}/subtitles/{name}_caption.json"):
+            shots.append(name)
+    return shots
+
+
+def create_all_videos(shots: List[str], threads_per_shot: int = 4) -> Dict[str, Optional[str]]:
+    """
+    多进程并行渲染多个分集（各分集输入输出互不相关）
+    
+    Args:
+        shots: 分集名称列表
+        threads_per_shot: 每个分集渲染和编码使用的线程数
+    
+    Returns:
+        {分集名称: 输出视频路径（失败为None）}
+    """
+    cpu_count = os.cpu_count() or 1
+    max_processes = max(1, min(len(shots), cpu_count // threads_per_shot))
+    print(f"=== 并行渲染 {len(shots)} 个分集（{max_processes} 个进程 × {threads_per_shot} 线程） ===")
+    
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_processes) as executor:
+        future_to_shot = {
+            executor.submit(create_complete_video, shot, threads_per_shot): shot
+            for shot in shots
+        }
+        for future in as_completed(future_to_shot):
+            shot = future_to_shot[future]
+            try:
+                results[shot] = future.result()
+            except Exception as e:
+                print(f"{shot} 渲染失败: {e}")
+                results[shot] = None
+            print(f"{shot} 完成: {results[shot]}")
+    
+    return results
+
+
+def concatenate_videos(video_paths: List[str], output_path: str) -> Optional[str]:
+    """
+    使用ffmpeg concat demuxer无损拼接视频（流复制，不解码不重新编码）
+    
+    各分集由create_complete_video以相同的编码参数生成，可以直接拼接。
+    
+    Args:
+        video_paths: 按顺序排列的视频路径
+        output_path: 输出视频路径
+    
+    Returns:
+        输出视频路径，失败时返回None
+    """
+    list_path = f"{output_path}.txt"
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in video_paths:
+            escaped_path = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped_path}'\n")
+    
+    try:
+        subprocess.run(
+            [FFMPEG_BINARY, '-y', '-loglevel', 'error',
+             '-f', 'concat', '-safe', '0', '-i', list_path,
+             '-c', 'copy', output_path],
+            check=True
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"视频拼接失败: {e}")
+        return None
+    finally:
+        os.remove(list_path)
+    
+    total_duration = ffmpeg_parse_infos(output_path)['duration']
+    print(f"完整视频已拼接: {output_path}（{len(video_paths)} 个分集，总时长 {total_duration:.2f} 秒）")
+    return output_path
 
 
 if __name__ == "__main__":
     # 忽略警告
     warnings.filterwarnings("ignore", category=UserWarning)
     
-    # 默认渲染shot_02，可以通过命令行参数指定shot
+    # 默认渲染shot_02，可以通过命令行参数指定shot，"all" 表示并行渲染所有分集
+    # 加 --quick 参数时只用ffmpeg滤镜快速生成预览，加 --processes 参数时使用多进程渲染帧
     import sys
+    args = [arg for arg in sys.argv[1:] if arg not in ("--quick", "--processes")]
+    quick = "--quick" in sys.argv[1:]
+    use_processes = "--processes" in sys.argv[1:]
     shot = "shot_02"
-    if len(sys.argv) > 1:
-        shot = sys.argv[1]
-    
-    create_complete_video(shot)
+    if args:
+        shot = args[0]
+    
+    if quick:
+        for name in (get_all_shots() if shot == "all" else [shot]):
+            create_quick_video(name)
+    elif shot == "all":
+        shots = get_all_shots()
+        results = create_all_videos(shots)
+        # 所有分集都成功后再拼接
+        if shots and all(results.get(s) for s in shots):
+            concatenate_videos([results[s] for s in shots], "videos/complete_video_with_audio.mp4")
+    else:
+        create_complete_video(shot, use_processes=use_processes)